@@ -1,8 +1,16 @@
 from math import inf
+from time import perf_counter
 
-from typing import Union, Optional, Iterable
+from typing import Union, Optional, Iterable, Callable
 
 numeric = Union[int, float]
+metric_func = Callable[['Position', 'Position'], numeric]
+
+# Cell.py's module flag for checking the search's own objects: when True, positions and
+# cells created internally by the search (Position._unchecked, Cell._child) are validated like
+# the ones passed in by users. Set it with `Cell.CHECK_POSITIONS = True` before searching,
+# it only helps to find bugs in the search and slows it down.
+CHECK_POSITIONS: bool = False
 
 
 def distance(point1: 'Position', point2: 'Position', *, p: numeric = 2) -> float:
@@ -33,6 +41,15 @@ def distance(point1: 'Position', point2: 'Position', *, p: numeric = 2) -> float
     if p is inf: return max(abs(point1.x - point2.x), abs(point1.y - point2.y))
     else: return (abs(point1.x - point2.x) ** p + abs(point1.y - point2.y) ** p) ** (1 / p)
 
+def chebyshev_distance(point1: 'Position', point2: 'Position') -> numeric:
+    """
+    Find the Chebyshev distance between two Cartesian coordinates. This is the
+    default metric of Cell, where the robot moves freely in all 8 directions.
+
+    Unlike `distance`, this does not validate anything as it is called in the search loop.
+    """
+    return max(abs(point1[0] - point2[0]), abs(point1[1] - point2[1]))
+
 
 class Position(tuple):
     """
@@ -65,7 +82,20 @@ class Position(tuple):
         if not isinstance(y, numeric):
             raise TypeError(f"y-coordinates must be int or float, '{y}' was given")
         return super().__new__(cls, (x, y))
-    
+
+    @classmethod
+    def _unchecked(cls, x: numeric, y: numeric) -> 'Position':
+        """
+        Create a position without validation. Only used for coordinates computed
+        from already valid positions.
+        """
+        if CHECK_POSITIONS: return cls(x, y)
+        return tuple.__new__(cls, (x, y))
+
+    def __getnewargs__(self) -> tuple[numeric, numeric]:
+        # needed to pickle positions, e.g. when sending them to other processes
+        return self.x, self.y
+
     @property
     def x(self) -> numeric:
         """The x-coordinate of position"""
@@ -77,21 +107,36 @@ class Position(tuple):
 
 
 class Cell:
-    __slots__ = 'position', 'parent', 'dirty_cells', 'moves', 'cost', 'heuristic_cost'
+    __slots__ = 'position', 'parent', 'dirty_cells', 'moves', 'cost', 'heuristic_cost', 'metric', '_hash'
     def __init__(self, position: Position, dirty_cells: Iterable[Position],
-                 moves: int = 0, parent: Optional['Cell'] = None) -> None:
+                 moves: numeric = 0, parent: Optional['Cell'] = None, *,
+                 metric: Optional[metric_func] = None) -> None:
+        """
+        Initialize a Cell instance.
+
+        ## Parameters:
+        position (Position): the current position of the robot\n
+        dirty_cells (Iterable[Position]): a collection of dirty cells' positions\n
+        moves (int | float): the distance the robot has moved. Should not be passed in for start state.\n
+        parent (Cell): the previous state. Should not be passed in for start state.\n
+        metric (Callable[[Position, Position], int | float] | None): the travel distance between
+        two positions. By default, this is the Chebyshev distance. A DistanceTable can be
+        passed instead for grids with obstacles.
+        """
         if not isinstance(position, Position):
             raise TypeError("position must be of type Position")
         elif (position.x < 1) or (position.y < 1):
             raise ValueError("position of cell must be larger than (1, 1)")
         if not isinstance(parent, Optional[Cell]):
             raise TypeError("parent must be of type Cell or None")
-        if not isinstance(moves, int):
-            raise TypeError("moves must be a positive integer")
+        if not isinstance(moves, numeric):
+            raise TypeError("moves must be a positive number")
+        if metric is None: metric = chebyshev_distance
 
         self.position = position
         self.parent = parent
         self.moves = moves
+        self.metric = metric
 
         self.dirty_cells = set()
         for cell_pos in dirty_cells:
@@ -99,15 +144,45 @@ class Cell:
                 raise TypeError("Items in dirty_cells must be of type Position.")
             self.dirty_cells.add(cell_pos)
 
+        self._hash = hash((position, frozenset(self.dirty_cells)))
         self.calc_cost()
 
-    def expand_cell(self) -> list['Cell']:
+    @classmethod
+    def _child(cls, parent: 'Cell', position: Position,
+               dirty_cells: set[Position], moves: numeric,
+               heuristic_timer: Optional[Callable[[float], None]] = None) -> 'Cell':
+        """
+        Create the next state of a parent state without validation.
+        dirty_cells is not copied, so it must not be shared with another state.
+        If heuristic_timer is given, it is called with the seconds spent on the heuristic.
+        """
+        if CHECK_POSITIONS: return cls(position, dirty_cells, moves, parent, metric=parent.metric)
+
+        cell = cls.__new__(cls)
+        cell.position = position
+        cell.parent = parent
+        cell.moves = moves
+        cell.metric = parent.metric
+        cell.dirty_cells = dirty_cells
+        cell._hash = hash((position, frozenset(dirty_cells)))
+        cell._cost()
+        if heuristic_timer is None: cell._heu_cost()
+        else:
+            begin = perf_counter()
+            cell._heu_cost()
+            heuristic_timer(perf_counter() - begin)
+        return cell
+
+    def expand_cell(self, heuristic_timer: Optional[Callable[[float], None]] = None) -> list['Cell']:
+        """
+        The states after cleaning each dirty cell next. heuristic_timer is passed to `_child`.
+        """
         neighbours = []
 
         for new_pos in self.dirty_cells:
-            neighbours.append(Cell(new_pos, parent=self,
-                                   dirty_cells=self.dirty_cells - {new_pos},
-                                   moves=self.moves + distance(self.position, new_pos, p=inf)))
+            neighbours.append(Cell._child(self, new_pos, self.dirty_cells - {new_pos},
+                                          self.moves + self.metric(self.position, new_pos),
+                                          heuristic_timer))
         return neighbours
     
 
@@ -122,13 +197,13 @@ class Cell:
             # cost to go from previous state to this state +
             # cost to clean the cell after n movements
             self.cost = self.parent.cost +\
-                        distance(self.parent.position, self.position, p=inf) +\
+                        self.metric(self.parent.position, self.position) +\
                         self.moves + 1
     
     def _heu_cost(self) -> None:
         self.heuristic_cost = 0
         for cell_pos in self.dirty_cells:
-            self.heuristic_cost += distance(self.position, cell_pos, p=inf) + self.moves + 1
+            self.heuristic_cost += self.metric(self.position, cell_pos) + self.moves + 1
         
 
     def __eq__(self, other: 'Cell') -> bool:
@@ -136,7 +211,9 @@ class Cell:
                (self.dirty_cells == other.dirty_cells)
     
     def __hash__(self) -> int:
-        return hash(self.position)
+        # states at the same position differ by their dirty cells, hashing only
+        # the position would make the priority queue's dict degrade to linear scans
+        return self._hash
     
     def __lt__(self, other: 'Cell') -> bool:
         return (self.cost + self.heuristic_cost) < (other.cost + other.heuristic_cost)
\ No newline at end of file
@@ -0,0 +1,187 @@
+import numpy as np
+
+from Cell import Position
+
+from typing import Iterable
+
+
+# moves of the robot as (dx, dy), the index of a move is stored as BFS parent
+MOVES: tuple[tuple[int, int], ...] = ((1, 0), (-1, 0), (0, 1), (0, -1),
+                                      (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def _shift(grid: np.ndarray, dx: int, dy: int) -> np.ndarray:
+    """
+    Shift the last two axes of a boolean grid so that `result[..., y, x] = grid[..., y - dy, x - dx]`.
+    Values shifted in from outside the grid are False.
+    """
+    rows, cols = grid.shape[-2:]
+    result = np.zeros_like(grid)
+    result[..., max(dy, 0):rows + min(dy, 0), max(dx, 0):cols + min(dx, 0)] =\
+        grid[..., max(-dy, 0):rows + min(-dy, 0), max(-dx, 0):cols + min(-dx, 0)]
+    return result
+
+def multi_source_bfs(free: np.ndarray, sources: list[Position],
+                     targets: list[Position]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Run a breadth-first search from every source at once over an occupancy grid.
+    The robot moves in 8 directions, but may not cut the corner of a blocked cell
+    when moving diagonally.
+
+    ## Parameters:
+    \tfree: boolean array of shape (rows, columns), True where the robot can move.
+    Cell at position (x, y) is stored at free[y - 1, x - 1].\
+    \tsources: positions to search from\
+    \ttargets: the search stops as soon as every target is reached from every source.
+    ## Returns:
+    \tA tuple of distances and parents, both of shape (len(sources), rows, columns).
+    Unreached cells have distance -1. Parent is the index in MOVES of the move used
+    to reach a cell, or -1 for sources and unreached cells.
+    """
+    source_no = len(sources)
+    distances = np.full((source_no, *free.shape), -1, dtype=np.int32)
+    parents = np.full((source_no, *free.shape), -1, dtype=np.int8)
+
+    source_index = np.arange(source_no)
+    src_ys = np.array([pos.y - 1 for pos in sources], dtype=np.intp)
+    src_xs = np.array([pos.x - 1 for pos in sources], dtype=np.intp)
+    tar_ys = np.array([pos.y - 1 for pos in targets], dtype=np.intp)
+    tar_xs = np.array([pos.x - 1 for pos in targets], dtype=np.intp)
+
+    # diagonal moves need both cells they pass by to be free
+    passable = []
+    for dx, dy in MOVES:
+        if dx and dy: passable.append(free & _shift(free, dx, 0) & _shift(free, 0, dy))
+        else: passable.append(free)
+
+    seen = np.zeros((source_no, *free.shape), dtype=bool)
+    seen[source_index, src_ys, src_xs] = True
+    distances[seen] = 0
+    frontier = seen.copy()
+    step = 0
+    while frontier.any() and not seen[:, tar_ys, tar_xs].all():
+        step += 1
+        reached = np.zeros_like(frontier)
+        for move_index, (dx, dy) in enumerate(MOVES):
+            new = _shift(frontier, dx, dy) & passable[move_index] & ~seen
+            parents[new] = move_index
+            seen |= new
+            reached |= new
+        distances[reached] = step
+        frontier = reached
+    return distances, parents
+
+
+class DistanceTable:
+    """
+    Pairwise travel distances between key positions (usually the start and the dirty cells)
+    of a grid with obstacles. Distances are computed once with a multi-source BFS when the
+    table is created, so looking up a distance is just an index into the table.
+
+    A DistanceTable is callable with two positions and can be passed as `metric` of Cell
+    or astar_vacuum. Use `move` in place of chebyshev_move to expand the solution to a full path.
+
+    # Attributes:
+    grid_dim (tuple[int, int]): the number of rows and columns of the grid\
+
+    occupancy (np.ndarray): boolean array of shape grid_dim, True where the cell is blocked.
+    Cell at position (x, y) is stored at occupancy[y - 1, x - 1]\
+
+    positions (list[Position]): the key positions of the table\
+
+    distances (list[list[int]]): distances[i][j] is the travel distance from positions[i]
+    to positions[j]
+    """
+    __slots__ = 'grid_dim', 'occupancy', 'positions', 'distances', '_index', '_parents'
+    def __init__(self, grid_dim: tuple[int, int], obstacles: Iterable[Position],
+                 positions: Iterable[Position]) -> None:
+        """
+        Build the distance table.
+
+        ## Parameters:
+        grid_dim (tuple[int, int]): the number of rows and columns of the grid\n
+        obstacles (Iterable[Position]): positions of blocked cells\n
+        positions (Iterable[Position]): the key positions to compute distances between
+
+        ## Raises:
+        ValueError if a position is outside the grid, a key position is blocked
+        or a key position cannot be reached from another.
+        """
+        rows, cols = grid_dim
+        self.grid_dim = (rows, cols)
+        self.occupancy = np.zeros((rows, cols), dtype=bool)
+        for pos in obstacles:
+            self._check_bounds(pos)
+            self.occupancy[pos.y - 1, pos.x - 1] = True
+
+        self.positions: list[Position] = []
+        self._index: dict[Position, int] = {}
+        self.distances: list[list[int]] = []
+        self._parents = np.empty((0, rows, cols), dtype=np.int8)
+        self.add_positions(positions)
+
+    def _check_bounds(self, pos: Position) -> None:
+        if (pos.x < 1) or (pos.y < 1) or\
+           (pos.x > self.grid_dim[1]) or (pos.y > self.grid_dim[0]):
+            raise ValueError(f"Position {pos} is outside of the grid")
+
+    def add_positions(self, positions: Iterable[Position]) -> None:
+        """
+        Add key positions to the table. Only the new positions are searched from, the
+        distances already in the table are kept.
+
+        ## Raises:
+        ValueError if a position is outside the grid, blocked or cannot be reached
+        from the other key positions. The table is left unchanged in that case.
+        """
+        new_positions = [pos for pos in dict.fromkeys(positions) if not pos in self._index]
+        if not new_positions: return
+        for pos in new_positions:
+            self._check_bounds(pos)
+            if self.occupancy[pos.y - 1, pos.x - 1]:
+                raise ValueError(f"Position {pos} is blocked by an obstacle")
+
+        all_positions = self.positions + new_positions
+        distances, parents = multi_source_bfs(~self.occupancy, new_positions, all_positions)
+        ys = [pos.y - 1 for pos in all_positions]
+        xs = [pos.x - 1 for pos in all_positions]
+        table = distances[:, ys, xs]
+        if (table < 0).any():
+            src, tar = np.argwhere(table < 0)[0]
+            raise ValueError(f"Position {all_positions[tar]} cannot be reached from {new_positions[src]}")
+
+        # moves are symmetric, so the distance from an old position to a new one
+        # is the distance back from the new position
+        # plain Python ints are much faster to look up in the search loop than numpy scalars
+        table = table.tolist()
+        for i, row in enumerate(self.distances):
+            row.extend(new_row[i] for new_row in table)
+        self.distances.extend(table)
+        for pos in new_positions:
+            self._index[pos] = len(self.positions)
+            self.positions.append(pos)
+        self._parents = np.concatenate((self._parents, parents))
+
+    def __call__(self, point1: Position, point2: Position) -> int:
+        return self.distances[self._index[point1]][self._index[point2]]
+
+    def __contains__(self, pos: Position) -> bool:
+        return pos in self._index
+
+    def move(self, start: Position, end: Position) -> list[Position]:
+        """
+        Return the positions the robot goes through on a shortest path from start to end,
+        including both ends. start must be one of the key positions of the table.
+        """
+        parents = self._parents[self._index[start]]
+        if (start != end) and (parents[end.y - 1, end.x - 1] < 0):
+            # the search from start stopped before reaching end, which happens when end
+            # was added later. Walk the path from end back to start instead.
+            return list(reversed(self.move(end, start)))
+        cur_x, cur_y = end
+        positions = [end]
+        while (cur_x != start.x) or (cur_y != start.y):
+            dx, dy = MOVES[parents[cur_y - 1, cur_x - 1]]
+            cur_x, cur_y = cur_x - dx, cur_y - dy
+            positions.append(Position._unchecked(cur_x, cur_y))
+        return list(reversed(positions))
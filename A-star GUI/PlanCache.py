@@ -0,0 +1,91 @@
+from collections import OrderedDict
+import json, os, os.path as osp
+
+from Cell import Position
+
+from typing import Iterable, Optional
+
+# (grid dimension, start, dirty cells)
+plan_key = tuple[tuple[int, int], Position, frozenset[Position]]
+
+
+class PlanCache:
+    """
+    Bounded cache of solved plans, keyed by the grid configuration. When full, the least
+    recently used plan is dropped. The cache can be saved to and loaded from a JSON file.
+
+    A plan is stored as its cost and the order in which dirty cells are cleaned, use
+    `replay_order` to rebuild the states of the plan.
+
+    -----------
+    ## Methods:
+    get: return the cost and cleaning order of a configuration, or None if not cached.\n
+    put: store the plan of a configuration.\n
+    load: read plans from the cache file.\n
+    save: write plans to the cache file.
+    """
+    __slots__ = 'capacity', 'filename', '_plans'
+    def __init__(self, capacity: int = 64, filename: Optional[str] = None) -> None:
+        """
+        Create an empty cache, then load the cache file if it exists.
+
+        ## Parameters:
+        capacity (int): the maximum number of plans kept\n
+        filename (str | None): path to the JSON file the cache is persisted to.
+        By default, the cache only lives in memory.
+        """
+        self.capacity = capacity
+        self.filename = filename
+        self._plans: OrderedDict[plan_key, tuple[float, list[Position]]] = OrderedDict()
+        if filename and osp.exists(filename): self.load()
+
+    @staticmethod
+    def key(grid_dim: Iterable[int], start: Iterable[int],
+            dirty_cells: Iterable[Position]) -> plan_key:
+        rows, columns = grid_dim
+        return (rows, columns), Position(*start), frozenset(dirty_cells)
+
+    def get(self, grid_dim: Iterable[int], start: Iterable[int],
+            dirty_cells: Iterable[Position]) -> Optional[tuple[float, list[Position]]]:
+        key = self.key(grid_dim, start, dirty_cells)
+        if not key in self._plans: return None
+        self._plans.move_to_end(key)
+        return self._plans[key]
+
+    def put(self, grid_dim: Iterable[int], start: Iterable[int],
+            dirty_cells: Iterable[Position], cost: float, order: list[Position]) -> None:
+        key = self.key(grid_dim, start, dirty_cells)
+        self._plans[key] = (cost, list(order))
+        self._plans.move_to_end(key)
+        while len(self._plans) > self.capacity:
+            self._plans.popitem(last=False)
+
+    def load(self) -> None:
+        """
+        Read plans from the cache file. A missing or corrupted file is ignored.
+        """
+        try:
+            with open(self.filename) as cache_file:
+                entries = json.load(cache_file)
+            for grid_dim, start, dirty, cost, order in entries:
+                self.put(grid_dim, start, [Position(*pos) for pos in dirty],
+                         cost, [Position(*pos) for pos in order])
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def save(self) -> None:
+        """
+        Write plans to the cache file, least recently used first.
+        """
+        if not self.filename: return
+        entries = [[list(grid_dim), list(start), sorted(dirty), cost, order]
+                   for (grid_dim, start, dirty), (cost, order) in self._plans.items()]
+        # write to a temporary file first so a crash does not leave a half-written cache
+        temp_name = self.filename + '.tmp'
+        with open(temp_name, 'w') as cache_file:
+            json.dump(entries, cache_file)
+        os.replace(temp_name, self.filename)
+
+    def __len__(self) -> int: return len(self._plans)
+
+    def __contains__(self, key: plan_key) -> bool: return key in self._plans
@@ -0,0 +1,148 @@
+from algorithm import astar_vacuum, replay_order
+from Cell import Position, Cell, metric_func, chebyshev_distance
+from DistanceTable import DistanceTable
+
+from typing import Iterable, Optional
+
+
+def order_cost(start: Position, order: Iterable[Position], metric: metric_func) -> float:
+    """
+    The cost of cleaning dirty cells in the given order, as astar_vacuum counts it.
+    """
+    cost = moves = 0
+    cur = start
+    for pos in order:
+        dist = metric(cur, pos)
+        moves += dist
+        cost += dist + moves + 1
+        cur = pos
+    return cost
+
+def cheapest_insertion(start: Position, order: list[Position], position: Position,
+                       metric: metric_func) -> list[Position]:
+    """
+    Return a copy of order with position inserted where it adds the least cost.
+    """
+    candidates = [order[:i] + [position] + order[i:] for i in range(len(order) + 1)]
+    return min(candidates, key=lambda candidate: order_cost(start, candidate, metric))
+
+
+class PlannerSession:
+    """
+    Keep a plan up to date while dirty cells appear, get cleaned by other means or
+    the robot moves, without solving from scratch every time.
+
+    After every event, the previous plan is repaired into a valid plan (a new cell is
+    inserted where it is cheapest, a removed cell is skipped) and its cost is passed to
+    astar_vacuum as upper bound, so only states that can beat it are searched. On grids
+    with obstacles, the DistanceTable is kept and only extended with new positions.
+    A plan is optimal unless a search runs out of iterations, in which case the best
+    plan found so far is kept.
+
+    # Attributes:
+    start (Position): the current position of the robot\
+
+    dirty_cells (set[Position]): the cells still to be cleaned\
+
+    metric (Callable[[Position, Position], int | float]): the travel distance used\
+
+    order (list[Position]): the dirty cells in cleaning order of the current plan\
+
+    cost (float): the cost of the current plan
+
+    -----------
+    ## Methods:
+    add_cell: a cell became dirty.\n
+    remove_cell: a cell was cleaned by other means.\n
+    move_robot: the robot moved, cleaning the cell it moved to if dirty.\n
+    path: the states of the current plan, as returned by astar_vacuum.
+    """
+    __slots__ = 'start', 'dirty_cells', 'metric', 'max_iter', 'order', 'cost'
+    def __init__(self, start: Position, dirty_cells: Iterable[Position], *,
+                 grid_dim: Optional[tuple[int, int]] = None,
+                 obstacles: Iterable[Position] = (),
+                 max_iter: int = 100000) -> None:
+        """
+        Create a session and solve the initial plan.
+
+        ## Parameters:
+        start (Position): the start position of the robot\n
+        dirty_cells (Iterable[Position]): positions of dirty cells\n
+        grid_dim (tuple[int, int] | None): the number of rows and columns of the grid.
+        Only needed with obstacles.\n
+        obstacles (Iterable[Position]): positions of blocked cells. Without obstacles,
+        the robot moves in Chebyshev distance.\n
+        max_iter (int): maximum number of iterations of every search
+
+        ## Raises:
+        ValueError if there are obstacles but no grid dimension, or a position is
+        blocked or cannot be reached (see DistanceTable).
+        """
+        self.start = start
+        self.dirty_cells: set[Position] = set(dirty_cells)
+        self.max_iter = max_iter
+
+        obstacles = list(obstacles)
+        if obstacles:
+            if grid_dim is None:
+                raise ValueError("grid_dim must be given for a grid with obstacles")
+            self.metric: metric_func = DistanceTable(grid_dim, obstacles,
+                                                     [start, *sorted(self.dirty_cells)])
+        else: self.metric = chebyshev_distance
+
+        self.order: list[Position] = []
+        for pos in sorted(self.dirty_cells):
+            self.order = cheapest_insertion(start, self.order, pos, self.metric)
+        self._replan()
+
+    def _replan(self) -> tuple[float, list[Position]]:
+        """
+        Search for a plan cheaper than the current order, keeping the current order
+        if there is none.
+        """
+        self.cost = order_cost(self.start, self.order, self.metric)
+        goal, traceback = astar_vacuum(self.dirty_cells, self.start, max_iter=self.max_iter,
+                                       do_traceback=True, metric=self.metric,
+                                       upper_bound=self.cost)
+        if goal is not None:
+            self.order = [cell.position for cell in traceback[1:]]
+            self.cost = goal.cost
+        return self.cost, self.order
+
+    def add_cell(self, position: Position) -> tuple[float, list[Position]]:
+        """
+        Add a dirty cell and replan. Returns the cost and cleaning order of the new plan.
+        """
+        if position in self.dirty_cells: return self.cost, self.order
+        if isinstance(self.metric, DistanceTable): self.metric.add_positions([position])
+        self.dirty_cells.add(position)
+        self.order = cheapest_insertion(self.start, self.order, position, self.metric)
+        return self._replan()
+
+    def remove_cell(self, position: Position) -> tuple[float, list[Position]]:
+        """
+        Remove a dirty cell that was cleaned by other means and replan.
+        Returns the cost and cleaning order of the new plan.
+        """
+        if not position in self.dirty_cells: return self.cost, self.order
+        self.dirty_cells.remove(position)
+        self.order.remove(position)
+        return self._replan()
+
+    def move_robot(self, position: Position) -> tuple[float, list[Position]]:
+        """
+        Move the robot and replan. If the robot moves to a dirty cell, the cell is cleaned.
+        Returns the cost and cleaning order of the new plan.
+        """
+        if isinstance(self.metric, DistanceTable): self.metric.add_positions([position])
+        self.start = position
+        if position in self.dirty_cells:
+            self.dirty_cells.remove(position)
+            self.order.remove(position)
+        return self._replan()
+
+    def path(self) -> list[Cell]:
+        """
+        The states of the current plan, from the robot's position to the goal.
+        """
+        return replay_order(self.start, self.order, metric=self.metric)
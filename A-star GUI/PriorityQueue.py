@@ -5,7 +5,6 @@ from typing import TypeVar, Generic, Iterator,\
 T = TypeVar('T')
 
 
-# item = [item, count, is_removed]
 # count used for FIFO structuring when priority is equal
 
 def _counter() -> Iterator[int]:
@@ -15,6 +14,23 @@ def _counter() -> Iterator[int]:
     num = 0
     while (num := num + 1): yield num
 
+class _Entry(Generic[T]):
+    """
+    Heap entry of an item. Entries compare by the items' priority, then by count.
+    Lists of [item, count] would compare equal items (a == b) by count alone, whatever
+    their priority, which breaks the heap when an item is updated.
+    """
+    __slots__ = "item", "count", "is_removed"
+    def __init__(self, item: T, count: int) -> None:
+        self.item = item
+        self.count = count
+        self.is_removed = False
+
+    def __lt__(self, other: '_Entry[T]') -> bool:
+        if self.item < other.item: return True
+        if other.item < self.item: return False
+        return self.count < other.count
+
 class PriorityQueue(Generic[T]):
     """
     Priority Queue implemented with minimum heap. This priority queue supports\
@@ -33,12 +49,13 @@ class PriorityQueue(Generic[T]):
     pop: removes and return item with highest priority.\n
     seek: return item with highest priority (does not remove item).\n
     clear: clear the queue.\n
+    get: get the item in queue equal to an item.\n
     get_attr: get an attribute of item in queue.
     """
     __slots__ = "_min_heap", "_items_list", "_counter"
     def __init__(self, items: Optional[Iterable[T]] = None) -> None:
-        self._min_heap: list[list[T, int, bool]] = []
-        self._items_list: dict[T, list[T, int, bool]] = {}
+        self._min_heap: list[_Entry[T]] = []
+        self._items_list: dict[T, _Entry[T]] = {}
         self._counter = _counter()
 
         if items:
@@ -64,9 +81,9 @@ class PriorityQueue(Generic[T]):
         # Remove item if already exists
         if item in self._items_list:
             # Flag item as removed
-            self._items_list[item][2] = True
+            self._items_list[item].is_removed = True
 
-        new_item = [item, next(self._counter), False]
+        new_item = _Entry(item, next(self._counter))
         self._items_list[item] = new_item
         hq.heappush(self._min_heap, new_item)
 
@@ -79,10 +96,10 @@ class PriorityQueue(Generic[T]):
         IndexError if queue is empty.
         """
         while self._min_heap:
-            item, _, is_removed = hq.heappop(self._min_heap)
-            if not is_removed:
-                del self._items_list[item]
-                return item
+            entry = hq.heappop(self._min_heap)
+            if not entry.is_removed:
+                del self._items_list[entry.item]
+                return entry.item
         raise IndexError("Queue is empty")
 
 
@@ -91,8 +108,8 @@ class PriorityQueue(Generic[T]):
         Return the item with smallest priority without removal.
         """
         while self._min_heap:
-            item, _, is_removed = self._min_heap[0]
-            if not is_removed: return item
+            entry = self._min_heap[0]
+            if not entry.is_removed: return entry.item
             else: hq.heappop(self._min_heap)
 
     def clear(self) -> None:
@@ -103,6 +120,14 @@ class PriorityQueue(Generic[T]):
         self._items_list.clear()
         self._counter = _counter()
 
+    def get(self, item: T, default: Optional[T] = None) -> Optional[T]:
+        """
+        Return the item stored in queue that is equal to item. If item is not found,
+        return the default value instead.
+        """
+        if item in self._items_list: return self._items_list[item].item
+        else: return default
+
     def get_attr(self, item: T, attr: str, *, default_value = None):
         """
         Get the attribute of item stored in PriorityQueue. If item is not found, return\
@@ -125,7 +150,7 @@ class PriorityQueue(Generic[T]):
         default_value (Any | None): the default value to return if item is not found. Value is `None` by default
         """
         if item in self._items_list:
-            return getattr(self._items_list[item][0], attr)
+            return getattr(self._items_list[item].item, attr)
         else: return default_value
 
 
@@ -0,0 +1,160 @@
+from hashlib import blake2b
+import json, os, sqlite3
+import numpy as np
+
+from algorithm import astar_vacuum, replay_order
+from Cell import Position, Cell
+
+from typing import Iterable, Optional
+
+
+# the 8 symmetries of the square (rotations and reflections) as 2x2 matrices
+D4: tuple[np.ndarray, ...] = tuple(np.array(matrix) for matrix in
+                                   (((1, 0), (0, 1)), ((0, -1), (1, 0)),
+                                    ((-1, 0), (0, -1)), ((0, 1), (-1, 0)),
+                                    ((-1, 0), (0, 1)), ((1, 0), (0, -1)),
+                                    ((0, 1), (1, 0)), ((0, -1), (-1, 0))))
+
+
+class Canonical:
+    """
+    Canonical form of a vacuum instance under rotations, reflections and translation.
+
+    With the Chebyshev metric, the cost of a plan only depends on the distances between
+    the start and the dirty cells, which these transformations keep. Instances that are
+    transformations of each other therefore share the same solution, only transformed.
+    The grid dimension does not change distances either, so it is not part of the form.
+
+    # Attributes:
+    key (bytes): hash of the canonical bitmask, the same for all equivalent instances\
+
+    matrix (np.ndarray): the symmetry mapping the instance to its canonical form\
+
+    offset (np.ndarray): the translation applied after the symmetry
+    """
+    __slots__ = 'key', 'matrix', 'offset'
+    def __init__(self, start: Position, dirty_cells: Iterable[Position]) -> None:
+        points = np.array([start, *sorted(set(dirty_cells))], dtype=np.int64)
+        best = None
+        for matrix in D4:
+            transformed = points @ matrix.T
+            offset = transformed.min(axis=0)
+            transformed -= offset
+            width, height = transformed.max(axis=0) + 1
+            mask = np.zeros((height, width), dtype=bool)
+            mask[transformed[1:, 1], transformed[1:, 0]] = True
+            # box size and start first, so that different boxes never share a bitmask
+            encoding = np.array([width, height, *transformed[0]], dtype=np.int64).tobytes() +\
+                       np.packbits(mask).tobytes()
+            if best is None or encoding < best[0]: best = encoding, matrix, offset
+
+        encoding, self.matrix, self.offset = best
+        self.key = blake2b(encoding, digest_size=16).digest()
+
+    def to_canonical(self, positions: Iterable[Position]) -> list[tuple[int, int]]:
+        """Map positions of the instance to the canonical form"""
+        points = np.array(list(positions), dtype=np.int64).reshape(-1, 2)
+        return [tuple(point) for point in (points @ self.matrix.T - self.offset).tolist()]
+
+    def from_canonical(self, points: Iterable[tuple[int, int]]) -> list[Position]:
+        """Map positions of the canonical form back to the instance"""
+        points = np.array(list(points), dtype=np.int64).reshape(-1, 2)
+        # symmetries are orthogonal, so the inverse is the transpose
+        return [Position(x, y) for x, y in ((points + self.offset) @ self.matrix).tolist()]
+
+
+class SolutionStore:
+    """
+    Solutions of vacuum instances stored in an SQLite database, shared by every
+    instance that is a rotation, reflection or translation of another (see Canonical).
+    A solution is stored as its cost and cleaning order in canonical coordinates.
+
+    The database can be used by several processes at once. Every process opens its own
+    connection, and writes are single statements that SQLite applies atomically.
+
+    -----------
+    ## Methods:
+    get: return the cost and cleaning order of an instance, or None if not stored.\n
+    put: store the solution of an instance.\n
+    solve: look up an instance and only run astar_vacuum if it is not stored.\n
+    close: close the connection of this process.
+    """
+    __slots__ = 'filename', 'timeout', '_connection', '_pid'
+    def __init__(self, filename: str, *, timeout: float = 30) -> None:
+        """
+        Open the store, creating the database file if needed.
+
+        ## Parameters:
+        filename (str): path to the database file\n
+        timeout (float): seconds to wait for another process to finish writing
+        """
+        self.filename = filename
+        self.timeout = timeout
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid = None
+        with self._connect() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS solutions "
+                               "(key BLOB PRIMARY KEY, cost REAL, cleaning_order TEXT)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # connections cannot be shared with child processes, open a new one after a fork
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.filename, timeout=self.timeout)
+            # readers do not block the writer and the other way round
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._pid = os.getpid()
+        return self._connection
+
+    def _get(self, canonical: Canonical) -> Optional[tuple[float, list[Position]]]:
+        row = self._connect().execute("SELECT cost, cleaning_order FROM solutions WHERE key = ?",
+                                      (canonical.key,)).fetchone()
+        if row is None: return None
+        cost, order = row
+        return cost, canonical.from_canonical(json.loads(order))
+
+    def _put(self, canonical: Canonical, cost: float, order: list[Position]) -> None:
+        with self._connect() as connection:
+            connection.execute("INSERT OR REPLACE INTO solutions VALUES (?, ?, ?)",
+                               (canonical.key, cost, json.dumps(canonical.to_canonical(order))))
+
+    def get(self, start: Position,
+            dirty_cells: Iterable[Position]) -> Optional[tuple[float, list[Position]]]:
+        return self._get(Canonical(start, dirty_cells))
+
+    def put(self, start: Position, dirty_cells: Iterable[Position],
+            cost: float, order: list[Position]) -> None:
+        self._put(Canonical(start, dirty_cells), cost, order)
+
+    def solve(self, dirty_cells: Iterable[Position], start: Position, *,
+              max_iter: int = 100000) -> tuple[Optional[Cell], Optional[list[Cell]]]:
+        """
+        Solve an instance like astar_vacuum with do_traceback=True, using the stored
+        solution if there is one. New solutions are stored.
+        """
+        dirty_cells = set(dirty_cells)
+        canonical = Canonical(start, dirty_cells)
+        stored = self._get(canonical)
+        if stored is not None:
+            path = replay_order(start, stored[1])
+            return path[-1], path
+
+        goal, traceback = astar_vacuum(dirty_cells, start, max_iter=max_iter, do_traceback=True)
+        if goal is not None:
+            self._put(canonical, goal.cost, [cell.position for cell in traceback[1:]])
+        return goal, traceback
+
+    def close(self) -> None:
+        if self._connection is not None and self._pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+
+    def __len__(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def __getstate__(self) -> tuple[str, float]:
+        return self.filename, self.timeout
+
+    def __setstate__(self, state: tuple[str, float]) -> None:
+        self.filename, self.timeout = state
+        self._connection = None
+        self._pid = None
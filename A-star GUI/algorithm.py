@@ -1,7 +1,14 @@
+import numpy as np
+import json, time, tracemalloc
+from math import inf
+
 from PriorityQueue import PriorityQueue
-from Cell import Position, Cell
+from Cell import Position, Cell, metric_func, chebyshev_distance
+
+from typing import Iterable, Optional, Iterator, Callable
 
-from typing import Iterable, Optional
+# held_karp_vacuum needs memory for 2^k * k values with k dirty cells
+HELD_KARP_MAX_CELLS: int = 16
 
 def chebyshev_move(start: Position, end: Position) -> list[Position]:
     cur_x, cur_y = start
@@ -18,9 +25,196 @@ def chebyshev_move(start: Position, end: Position) -> list[Position]:
             #cur_y > end.y => dy < 0 => decrease cur_y
             if dy < 0: cur_y -= 1
             elif dy > 0: cur_y += 1
-        positions.append(Position(cur_x, cur_y))
+        positions.append(Position._unchecked(cur_x, cur_y))
     return positions
 
+def expand_path(path: list[Cell],
+                move: Optional[Callable[[Position, Position], list[Position]]] = None)\
+               -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Expand the states of a solution into every step of the robot, along with the cost timeline.
+    Cleaning a cell shows up as the same position twice in a row.
+
+    ## Parameters:
+    \tpath: the states returned by astar_vacuum with do_traceback=True\
+    \tmove: function giving the positions between two states, e.g. DistanceTable.move.
+    By default, the robot moves as in chebyshev_move and the whole path is computed
+    in one vectorized pass.
+    ## Returns:
+    \tA tuple of arrays xs, ys, clean_costs and current_costs, one item for each step.
+    """
+    if move is not None:
+        positions = []
+        for i, cell in enumerate(path[:-1]):
+            positions.extend(move(cell.position, path[i + 1].position))
+        positions.append(path[-1].position)
+        xs = np.array([pos.x for pos in positions])
+        ys = np.array([pos.y for pos in positions])
+    else:
+        points = np.array([cell.position for cell in path])
+        seg_start, seg_end = points[:-1], points[1:]
+        deltas = seg_end - seg_start
+        steps = np.abs(deltas).max(axis=1, initial=0)
+        # every segment is [start, ..., end] with steps + 1 positions, like chebyshev_move
+        seg_index = np.repeat(np.arange(len(steps)), steps + 1)
+        offsets = np.cumsum(steps + 1) - (steps + 1)
+        remaining = steps[seg_index] - (np.arange(len(seg_index)) - offsets[seg_index])
+        # the robot moves along the longer axis first, then diagonally
+        trajectory = seg_end[seg_index] - np.sign(deltas[seg_index]) *\
+                     np.minimum(np.abs(deltas[seg_index]), remaining[:, None])
+        trajectory = np.concatenate((trajectory, points[-1:]))
+        xs, ys = trajectory[:, 0], trajectory[:, 1]
+
+    cleaning = np.zeros(len(xs), dtype=bool)
+    cleaning[1:] = (xs[1:] == xs[:-1]) & (ys[1:] == ys[:-1])
+    # clean cost starts at 1 and increases with every move
+    clean_costs = np.cumsum(~cleaning)
+    cost_increase = np.where(cleaning, clean_costs, 1)
+    cost_increase[0] = 0
+    return xs, ys, clean_costs, np.cumsum(cost_increase)
+
+def iter_path(path: list[Cell]) -> Iterator[tuple[int, int, int, int]]:
+    """
+    Lazily yield every step of a solution as (x, y, clean_cost, current_cost).
+    This gives the same values as expand_path, one step at a time.
+    """
+    def positions() -> Iterator[tuple[int, int]]:
+        for i, cell in enumerate(path[:-1]):
+            start, end = cell.position, path[i + 1].position
+            dx, dy = end.x - start.x, end.y - start.y
+            sign_x, sign_y = (dx > 0) - (dx < 0), (dy > 0) - (dy < 0)
+            for remaining in range(max(abs(dx), abs(dy)), -1, -1):
+                yield end.x - sign_x * min(abs(dx), remaining),\
+                      end.y - sign_y * min(abs(dy), remaining)
+        yield path[-1].position
+
+    clean_cost, cur_cost = 1, 0
+    prev = None
+    for pos in positions():
+        if prev is not None:
+            if prev == pos: cur_cost += clean_cost
+            else:
+                clean_cost += 1
+                cur_cost += 1
+        prev = pos
+        yield pos[0], pos[1], clean_cost, cur_cost
+
+class SearchSnapshot:
+    """
+    State of a running astar_vacuum search, published to observers.
+
+    # Attributes:
+    position (Position): the position of the best state, the one being expanded\
+
+    frontier_size (int): the number of states waiting in the priority queue\
+
+    expanded (list[Position]): positions of states expanded since the previous snapshot\
+
+    expansions (int): the total number of states expanded so far
+    """
+    __slots__ = 'position', 'frontier_size', 'expanded', 'expansions'
+    def __init__(self, position: Position, frontier_size: int,
+                 expanded: list[Position], expansions: int) -> None:
+        self.position = position
+        self.frontier_size = frontier_size
+        self.expanded = expanded
+        self.expansions = expansions
+
+class SearchTrace:
+    """
+    Telemetry of one astar_vacuum search. Pass an instance as `trace` and save it
+    afterwards; the file is JSON with sorted keys, so traces of two runs can be diffed
+    or loaded into a notebook with json.load.
+
+    # Attributes:
+    depth_expansions (dict[int, int]): number of states expanded for each number of dirty
+    cells left\
+
+    f_values (list[tuple[int, float]]): (expansions, f-value) every time the f-value of the
+    expanded state rose above every previous one\
+
+    duplicates (int): generated states equal to a state already in the priority queue\
+
+    reopened (int): expanded states equal to a state expanded before\
+
+    heuristic_time (float): seconds spent evaluating the heuristic of generated states,
+    not measured when Cell.CHECK_POSITIONS validates them\
+
+    peak_memory (int | None): peak bytes allocated during the search, if `memory` is True\
+
+    memory_per_state (float | None): peak_memory divided by the number of states pushed\
+
+    stats (dict[str, int | float]): the stats of astar_vacuum and the wall time in seconds
+    """
+    __slots__ = 'memory', 'depth_expansions', 'f_values', 'duplicates', 'reopened',\
+                'heuristic_time', 'peak_memory', 'memory_per_state', 'stats',\
+                '_closed', '_best_f', '_tracing', '_begin'
+    def __init__(self, *, memory: bool = False) -> None:
+        """
+        ## Parameters:
+        memory (bool): measure the peak memory of the search with tracemalloc, which
+        slows it down several times
+        """
+        self.memory = memory
+        self.depth_expansions: dict[int, int] = {}
+        self.f_values: list[tuple[int, float]] = []
+        self.duplicates = 0
+        self.reopened = 0
+        self.heuristic_time = 0.0
+        self.peak_memory: Optional[int] = None
+        self.memory_per_state: Optional[float] = None
+        self.stats: dict[str, float] = {}
+        self._closed: set[Cell] = set()
+        self._best_f = -inf
+        self._tracing = False
+        self._begin = 0.0
+
+    def _start(self) -> None:
+        if self.memory:
+            # leave tracemalloc running if the caller started it
+            self._tracing = not tracemalloc.is_tracing()
+            if self._tracing: tracemalloc.start()
+            tracemalloc.reset_peak()
+        self._begin = time.perf_counter()
+
+    def _expand(self, cell: Cell, expansions: int) -> None:
+        depth = len(cell.dirty_cells)
+        self.depth_expansions[depth] = self.depth_expansions.get(depth, 0) + 1
+        if (f_value := cell.cost + cell.heuristic_cost) > self._best_f:
+            self._best_f = f_value
+            self.f_values.append((expansions, f_value))
+        if cell in self._closed: self.reopened += 1
+        else: self._closed.add(cell)
+
+    def _time_heuristic(self, seconds: float) -> None:
+        # called by Cell._child with the time of each heuristic it evaluates
+        self.heuristic_time += seconds
+
+    def _finish(self, stats: dict[str, int]) -> None:
+        self.stats = {**stats, 'time': time.perf_counter() - self._begin}
+        if self.memory:
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            if self._tracing: tracemalloc.stop()
+            self.memory_per_state = self.peak_memory / max(stats['pushes'], 1)
+        self._closed = set()
+
+    def to_dict(self) -> dict:
+        return {'depth_expansions': {str(depth): count for depth, count
+                                     in sorted(self.depth_expansions.items())},
+                'f_values': [list(item) for item in self.f_values],
+                'duplicates': self.duplicates, 'reopened': self.reopened,
+                'heuristic_time': self.heuristic_time, 'peak_memory': self.peak_memory,
+                'memory_per_state': self.memory_per_state, 'stats': self.stats}
+
+    def save(self, filename: str) -> None:
+        """Write the trace to a JSON file, one line per item of f_values."""
+        data = self.to_dict()
+        f_values = data.pop('f_values')
+        text = json.dumps(data, sort_keys=True, separators=(',', ':'))
+        lines = ',\n'.join(json.dumps(item) for item in f_values)
+        with open(filename, 'w') as file:
+            file.write(f'{text[:-1]},"f_values":[\n{lines}\n]}}\n')
+
 def path_traceback(start_state: Cell, goal_state: Cell) -> list[Cell]:
     path = []
     while goal_state != start_state:
@@ -29,26 +223,165 @@ def path_traceback(start_state: Cell, goal_state: Cell) -> list[Cell]:
     path.append(start_state)
     return list(reversed(path))
 
+def replay_order(start: Position, order: Iterable[Position], *,
+                 metric: Optional[metric_func] = None) -> list[Cell]:
+    """
+    Rebuild the states of a solution from the order in which the dirty cells are cleaned,
+    e.g. for a plan loaded from a cache. The result is the same as the traceback of astar_vacuum.
+    """
+    order = list(order)
+    state = Cell(position=start, dirty_cells=order, metric=metric)
+    states = [state]
+    for pos in order:
+        state = Cell._child(state, pos, state.dirty_cells - {pos},
+                            state.moves + state.metric(state.position, pos))
+        states.append(state)
+    return states
+
 def astar_vacuum(dirty_cells: Iterable[Position],
                  start: Position, *,
                  max_iter: int = 100000,
-                 do_traceback: bool = False)\
+                 do_traceback: bool = False,
+                 metric: Optional[metric_func] = None,
+                 progress: Optional[Callable[[int, int, float], Optional[bool]]] = None,
+                 progress_interval: int = 1000,
+                 observer: Optional[Callable[[SearchSnapshot], None]] = None,
+                 observer_rate: float = 20,
+                 upper_bound: float = inf,
+                 stats: Optional[dict[str, int]] = None,
+                 trace: Optional[SearchTrace] = None)\
                 -> tuple[Cell, Optional[list[Cell]]]:
+    """
+    Find the cheapest way to clean every dirty cell with A* search.
+
+    ## Parameters:
+    \tdirty_cells: positions of dirty cells\
+    \tstart: start position of the robot\
+    \tmax_iter: maximum number of iterations before giving up\
+    \tdo_traceback: whether to return the states from start to goal\
+    \tmetric: the travel distance between two positions, Chebyshev distance by default\
+    \tprogress: called every `progress_interval` iterations with the number of expansions,
+    the frontier size and the best f-value so far. The search is cancelled if it returns True.\
+    \tobserver: called with a SearchSnapshot at most `observer_rate` times per second.\
+    \tupper_bound: cost of a known solution, e.g. a previous plan. States that cannot
+    be cheaper than this are never pushed, which keeps the frontier small.\
+    \tstats: if given, filled with the number of states expanded and pushed, and the
+    largest size of the priority queue.\
+    \ttrace: if given, filled with the telemetry of the search, see SearchTrace. This
+    slows the search down, without it the search does not pay for any of it.
+    ## Returns:
+    \tA tuple of the goal state and the traceback. The goal state is None if no solution
+    was found within max_iter iterations, the search was cancelled or no solution is
+    cheaper than upper_bound.
+    """
     my_queue: PriorityQueue[Cell] = PriorityQueue()
+    if trace is not None: trace._start()
 
-    start_node = Cell(position=start, dirty_cells=dirty_cells)
+    start_node = Cell(position=start, dirty_cells=dirty_cells, metric=metric)
     start_node.calc_cost()
     my_queue.push(start_node)
+    pushes, peak_frontier = 1, 1
+    heuristic_timer = None if trace is None else trace._time_heuristic
+    track_stats = (stats is not None) or (trace is not None)
+    expanded: list[Position] = []
+    next_snapshot = time.monotonic()
     i = -1
     while my_queue and (i := i + 1) < max_iter:
         cur = my_queue.pop()
+        if trace is not None: trace._expand(cur, i)
 
         if len(cur.dirty_cells) == 0: break
-        
-        for neighbour in cur.expand_cell():
-            if my_queue.get_attr(neighbour, 'cost', default_value=neighbour.cost + 1) > neighbour.cost:
+        if (progress is not None) and (i % progress_interval == 0) and\
+           progress(i, len(my_queue), cur.cost + cur.heuristic_cost): break
+        if observer is not None:
+            expanded.append(cur.position)
+            if (now := time.monotonic()) >= next_snapshot:
+                observer(SearchSnapshot(cur.position, len(my_queue), expanded, i + 1))
+                expanded = []
+                next_snapshot = now + 1 / observer_rate
+
+        for neighbour in cur.expand_cell(heuristic_timer):
+            # the heuristic never overestimates, so the state cannot beat the bound
+            if neighbour.cost + neighbour.heuristic_cost >= upper_bound: continue
+            # equal states have the same cells left, but not necessarily the same moves,
+            # which every later cleaning pays for. Their f-values account for both.
+            queued = my_queue.get(neighbour)
+            if (queued is not None) and (trace is not None): trace.duplicates += 1
+            if (queued is None) or (neighbour < queued):
                 my_queue.push(neighbour)
+                pushes += 1
+        if track_stats and len(my_queue) > peak_frontier: peak_frontier = len(my_queue)
+
+    if track_stats:
+        if stats is None: stats = {}
+        stats.update(expansions=i + 1 if i < max_iter else max_iter,
+                     pushes=pushes, peak_frontier=peak_frontier)
+        if trace is not None: trace._finish(stats)
 
     traceback = path_traceback(start_node, cur) if do_traceback else None
     if len(cur.dirty_cells) != 0: cur = None
-    return cur, traceback
\ No newline at end of file
+    return cur, traceback
+
+
+def held_karp_vacuum(dirty_cells: Iterable[Position],
+                     start: Position, *,
+                     do_traceback: bool = False,
+                     metric: Optional[metric_func] = None)\
+                    -> tuple[Cell, Optional[list[Cell]]]:
+    """
+    Find the cheapest way to clean every dirty cell with dynamic programming over subsets
+    of dirty cells (Held-Karp). This is exact, but takes O(2^k k^2) time and O(2^k k) memory
+    for k dirty cells, so it is only meant for small instances and for checking astar_vacuum.
+
+    The distance of the i-th move (1-indexed) of k is paid k - i + 2 times: once to travel
+    and once in the cleaning cost of every cell cleaned from then on. The total cost is the
+    weighted sum of the distances plus 1 for every cell.
+
+    ## Parameters:
+    \tdirty_cells: positions of dirty cells, at most HELD_KARP_MAX_CELLS\
+    \tstart: start position of the robot\
+    \tdo_traceback: whether to return the states from start to goal\
+    \tmetric: the travel distance between two positions, Chebyshev distance by default
+    ## Returns:
+    \tA tuple of the goal state and the traceback, like astar_vacuum.
+    ## Raises:
+    \tValueError if there are more than HELD_KARP_MAX_CELLS dirty cells
+    """
+    cells = sorted(set(dirty_cells))
+    cell_no = len(cells)
+    if cell_no > HELD_KARP_MAX_CELLS:
+        raise ValueError(f"held_karp_vacuum solves at most {HELD_KARP_MAX_CELLS} dirty cells, "
+                         f"{cell_no} were given")
+    if metric is None: metric = chebyshev_distance
+    if cell_no == 0:
+        goal = Cell(position=start, dirty_cells=[], metric=metric)
+        return goal, [goal] if do_traceback else None
+
+    from_start = np.array([metric(start, cell) for cell in cells], dtype=np.float64)
+    # distances[j, last] is the distance from cells[last] to cells[j]
+    distances = np.array([[metric(other, cell) for other in cells] for cell in cells], dtype=np.float64)
+    bits = 1 << np.arange(cell_no)
+    masks = np.arange(1 << cell_no)
+    popcounts = ((masks[:, None] & bits) != 0).sum(axis=1)
+
+    # best[mask, last]: the cheapest weighted distance to clean the cells in mask, ending at last
+    best = np.full((1 << cell_no, cell_no), np.inf)
+    parent = np.full((1 << cell_no, cell_no), -1, dtype=np.int8)
+    best[bits, np.arange(cell_no)] = (cell_no + 1) * from_start
+    for legs in range(2, cell_no + 1):
+        new_masks = masks[popcounts == legs]
+        # for every cell j in the new mask, the cells cleaned before it
+        previous = new_masks[:, None] ^ bits
+        candidates = best[previous] + (cell_no - legs + 2) * distances
+        candidates[(new_masks[:, None] & bits) == 0] = np.inf
+        parent[new_masks] = candidates.argmin(axis=2)
+        best[new_masks] = candidates.min(axis=2)
+
+    mask = (1 << cell_no) - 1
+    last = int(best[mask].argmin())
+    order = []
+    while last >= 0:
+        order.append(cells[last])
+        mask, last = mask ^ (1 << last), int(parent[mask, last])
+    states = replay_order(start, reversed(order), metric=metric)
+    return states[-1], states if do_traceback else None
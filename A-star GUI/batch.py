@@ -0,0 +1,169 @@
+"""
+Solve many vacuum instances from the command line, without the GUI.
+
+Instances are read from a JSONL file, one object per line:
+
+    {"id": "room-1", "grid_dim": [rows, columns], "start": [x, y], "dirty": [[x, y], ...]}
+
+or from a CSV file with the header `id,rows,columns,start_x,start_y,dirty`, where dirty
+is a JSON list of [x, y] pairs. Results are written as JSONL in input order, one line
+per instance:
+
+    {"id": ..., "status": "solved" | "unsolved" | "timeout" | "error", "cost": ...,
+     "path": [[x, y], ...], "expansions": ..., "time": ...}
+
+The path is the start followed by the dirty cells in cleaning order, or every step of
+the robot with --full-path.
+
+Usage: python batch.py instances.jsonl -o results.jsonl --timeout 10
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse, csv, json, sys, time
+
+from algorithm import astar_vacuum, expand_path, replay_order
+from Cell import Position
+from SolutionStore import SolutionStore
+
+from typing import Any, Iterator, Optional, TextIO
+
+
+def read_instances(file: TextIO, file_format: str) -> Iterator[dict[str, Any]]:
+    """
+    Yield instances of a JSONL or CSV file as dicts with keys id, grid_dim, start and dirty.
+    """
+    # a bad line is reported as an error result, so that it does not stop the batch
+    if file_format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            try:
+                yield {'id': row.get('id'),
+                       'grid_dim': [int(row['rows']), int(row['columns'])],
+                       'start': [int(row['start_x']), int(row['start_y'])],
+                       'dirty': json.loads(row['dirty'] or '[]')}
+            except (KeyError, TypeError, ValueError) as error:
+                yield {'id': row.get('id') or reader.line_num,
+                       'invalid': f"Line {reader.line_num} is not a valid instance: {error}"}
+    else:
+        for line_no, line in enumerate(file, 1):
+            if not line.strip(): continue
+            try: instance = json.loads(line)
+            except ValueError as error:
+                instance = {'invalid': f"Line {line_no} is not valid JSON: {error}"}
+            if not isinstance(instance, dict):
+                instance = {'invalid': f"Line {line_no} is not a JSON object"}
+            instance.setdefault('id', line_no)
+            yield instance
+
+def _parse(instance: dict[str, Any]) -> tuple[Position, set[Position]]:
+    if 'invalid' in instance: raise ValueError(instance['invalid'])
+    rows, columns = instance['grid_dim']
+    start = Position(*instance['start'])
+    dirty_cells = {Position(*pos) for pos in instance['dirty']}
+    for pos in (start, *dirty_cells):
+        if (pos.x < 1) or (pos.y < 1) or (pos.x > columns) or (pos.y > rows):
+            raise ValueError(f"Position {tuple(pos)} is outside of the {rows}x{columns} grid")
+    return start, dirty_cells
+
+def solve_instance(instance: dict[str, Any], *, timeout: Optional[float] = None,
+                   max_iter: int = 100000, full_path: bool = False,
+                   store: Optional[SolutionStore] = None) -> dict[str, Any]:
+    """
+    Solve one instance and return its result line. Errors in the instance are reported
+    in the result instead of being raised.
+    """
+    result = {'id': instance.get('id'), 'status': 'error', 'cost': None, 'path': None,
+              'expansions': 0, 'time': 0.0}
+    begin = time.perf_counter()
+    try:
+        start, dirty_cells = _parse(instance)
+    except (KeyError, TypeError, ValueError) as error:
+        result['error'] = str(error)
+        return result
+
+    stored = store.get(start, dirty_cells) if store is not None else None
+    if stored is not None:
+        result['status'], result['cost'] = 'solved', stored[0]
+        traceback = None
+        order = [start, *stored[1]]
+    else:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        expansions = [0]
+        def check_deadline(i: int, *_) -> bool:
+            expansions[0] = i + 1
+            return (deadline is not None) and (time.monotonic() > deadline)
+
+        goal, traceback = astar_vacuum(dirty_cells, start, max_iter=max_iter, do_traceback=True,
+                                       progress=check_deadline, progress_interval=1)
+        result['expansions'] = expansions[0]
+        if goal is None:
+            timed_out = (deadline is not None) and (time.monotonic() > deadline)
+            result['status'] = 'timeout' if timed_out else 'unsolved'
+            result['time'] = time.perf_counter() - begin
+            return result
+
+        result['status'], result['cost'] = 'solved', goal.cost
+        order = [cell.position for cell in traceback]
+        if store is not None: store.put(start, dirty_cells, goal.cost, order[1:])
+
+    if full_path:
+        if traceback is None: traceback = replay_order(start, order[1:])
+        xs, ys, _, _ = expand_path(traceback)
+        result['path'] = [[x, y] for x, y in zip(xs.tolist(), ys.tolist())]
+    else:
+        result['path'] = [list(pos) for pos in order]
+    result['time'] = time.perf_counter() - begin
+    return result
+
+def _solve_kwargs(kwargs_instance: tuple[dict[str, Any], dict[str, Any]]) -> dict[str, Any]:
+    kwargs, instance = kwargs_instance
+    return solve_instance(instance, **kwargs)
+
+def run_batch(instances: Iterator[dict[str, Any]], output: TextIO, *,
+              max_workers: Optional[int] = None, chunksize: int = 16, **kwargs) -> dict[str, int]:
+    """
+    Solve instances across a process pool and write each result to output as soon as
+    it is ready, in input order. Extra keyword arguments are passed to solve_instance.
+    Returns the number of results of each status.
+    """
+    counts: dict[str, int] = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        jobs = ((kwargs, instance) for instance in instances)
+        for result in executor.map(_solve_kwargs, jobs, chunksize=chunksize):
+            output.write(json.dumps(result) + '\n')
+            output.flush()
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+    return counts
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Solve vacuum robot instances in parallel.")
+    parser.add_argument('input', help="JSONL or CSV file of instances, '-' for stdin")
+    parser.add_argument('-o', '--output', default='-', help="JSONL file for results, stdout by default")
+    parser.add_argument('--format', choices=('jsonl', 'csv'),
+                        help="input format, guessed from the file extension by default")
+    parser.add_argument('--timeout', type=float, default=60, help="seconds allowed per instance")
+    parser.add_argument('--max-iter', type=int, default=100000, help="maximum iterations per instance")
+    parser.add_argument('--workers', type=int, help="number of processes, by default the number of CPUs")
+    parser.add_argument('--chunksize', type=int, default=16, help="instances sent to a process at once")
+    parser.add_argument('--full-path', action='store_true', help="output every step instead of the cleaning order")
+    parser.add_argument('--store', help="SQLite solution store to look up and save solutions")
+    args = parser.parse_args(argv)
+
+    file_format = args.format or ('csv' if args.input.lower().endswith('.csv') else 'jsonl')
+    input_file = sys.stdin if args.input == '-' else open(args.input, newline='')
+    output_file = sys.stdout if args.output == '-' else open(args.output, 'w')
+    store = SolutionStore(args.store) if args.store else None
+    try:
+        counts = run_batch(read_instances(input_file, file_format), output_file,
+                           max_workers=args.workers, chunksize=args.chunksize,
+                           timeout=args.timeout, max_iter=args.max_iter,
+                           full_path=args.full_path, store=store)
+    finally:
+        if input_file is not sys.stdin: input_file.close()
+        if output_file is not sys.stdout: output_file.close()
+    print(', '.join(f"{status}: {count}" for status, count in sorted(counts.items())) or "no instances",
+          file=sys.stderr)
+    return 0 if not counts.get('error') else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
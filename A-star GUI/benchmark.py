@@ -0,0 +1,157 @@
+"""
+Reference benchmark of the vacuum planner.
+
+Sweeps grid dimensions, dirty cell counts and start placements with fixed seeds and runs
+every engine on the same instances. For each run it records wall time, expansions, pushes,
+peak frontier, peak memory and solution cost, and prints the mean time of each engine side
+by side. Run it before and after every performance change to Cell, PriorityQueue or
+astar_vacuum and compare the JSON reports.
+
+Peak memory is measured with tracemalloc in a second run of the same instance, so that
+tracing does not slow down the timed run. Pass --no-memory to skip it.
+
+Usage: python benchmark.py --grids 10x10 50x50 --dirty 4 8 10 -o results.json
+"""
+import argparse, json, platform, random, statistics, sys, time, tracemalloc
+
+from algorithm import astar_vacuum
+from Cell import Position
+from DistanceTable import DistanceTable
+from PlannerSession import PlannerSession
+
+from typing import Any, Callable, Optional
+
+# an engine solves (grid_dim, start, dirty cells, max_iter) and returns its cost and the
+# stats of astar_vacuum, empty if it has none
+engine_func = Callable[[tuple[int, int], Position, set[Position], int], tuple[Optional[float], dict[str, int]]]
+
+
+def _astar(grid_dim: tuple[int, int], start: Position, dirty_cells: set[Position],
+           max_iter: int) -> tuple[Optional[float], dict[str, int]]:
+    stats = {}
+    goal, _ = astar_vacuum(dirty_cells, start, max_iter=max_iter, stats=stats)
+    return (None if goal is None else goal.cost), stats
+
+def _astar_table(grid_dim: tuple[int, int], start: Position, dirty_cells: set[Position],
+                 max_iter: int) -> tuple[Optional[float], dict[str, int]]:
+    stats = {}
+    table = DistanceTable(grid_dim, [], [start, *dirty_cells])
+    goal, _ = astar_vacuum(dirty_cells, start, max_iter=max_iter, metric=table, stats=stats)
+    return (None if goal is None else goal.cost), stats
+
+def _session(grid_dim: tuple[int, int], start: Position, dirty_cells: set[Position],
+             max_iter: int) -> tuple[Optional[float], dict[str, int]]:
+    session = PlannerSession(start, dirty_cells, max_iter=max_iter)
+    # the session keeps a valid plan even when the search runs out of iterations. Its search
+    # runs inside PlannerSession, so it has no stats: expansions, pushes and peak_frontier
+    # are None in its results
+    return session.cost, {}
+
+ENGINES: dict[str, engine_func] = {
+    'astar': _astar,                # astar_vacuum with the Chebyshev metric
+    'astar_table': _astar_table,    # astar_vacuum with a DistanceTable of the empty grid
+    'session': _session,            # PlannerSession, bounded by a cheapest insertion plan
+}
+
+
+def make_instance(grid_dim: tuple[int, int], dirty_no: int, placement: str,
+                  seed: int) -> tuple[Position, set[Position]]:
+    """
+    A random instance, the same for the same arguments. placement is 'corner', 'center'
+    or 'random' and sets the start of the robot.
+    """
+    rng = random.Random(f"{grid_dim}-{dirty_no}-{placement}-{seed}")
+    rows, columns = grid_dim
+    if placement == 'corner': start = Position(1, 1)
+    elif placement == 'center': start = Position((columns + 1) // 2, (rows + 1) // 2)
+    else: start = Position(rng.randint(1, columns), rng.randint(1, rows))
+
+    dirty_cells = set()
+    while len(dirty_cells) < min(dirty_no, rows * columns):
+        dirty_cells.add(Position(rng.randint(1, columns), rng.randint(1, rows)))
+    return start, dirty_cells
+
+def run_engine(engine: str, grid_dim: tuple[int, int], start: Position,
+               dirty_cells: set[Position], *, max_iter: int = 100000,
+               memory: bool = True) -> dict[str, Any]:
+    """
+    Run one engine on one instance and return its measurements. The search stats are None
+    for engines that do not report them.
+    """
+    begin = time.perf_counter()
+    cost, stats = ENGINES[engine](grid_dim, start, dirty_cells, max_iter)
+    result = {'engine': engine, 'time_s': time.perf_counter() - begin, 'cost': cost,
+              'expansions': stats.get('expansions'), 'pushes': stats.get('pushes'),
+              'peak_frontier': stats.get('peak_frontier'), 'peak_memory_mb': None}
+    if memory:
+        tracemalloc.start()
+        ENGINES[engine](grid_dim, start, dirty_cells, max_iter)
+        result['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    return result
+
+def run_benchmark(grids: list[tuple[int, int]], dirty_counts: list[int], placements: list[str],
+                  engines: list[str], *, repeats: int = 3, seed: int = 0,
+                  max_iter: int = 100000, memory: bool = True) -> dict[str, Any]:
+    """
+    Run every engine on every instance of the sweep and return the report.
+    """
+    report = {'python': platform.python_version(), 'platform': platform.platform(),
+              'seed': seed, 'max_iter': max_iter, 'results': []}
+    for grid_dim in grids:
+        for dirty_no in dirty_counts:
+            for placement in placements:
+                for repeat in range(repeats):
+                    start, dirty_cells = make_instance(grid_dim, dirty_no, placement, seed + repeat)
+                    instance = {'grid_dim': list(grid_dim), 'dirty': dirty_no,
+                                'placement': placement, 'seed': seed + repeat}
+                    for engine in engines:
+                        result = run_engine(engine, grid_dim, start, dirty_cells,
+                                            max_iter=max_iter, memory=memory)
+                        report['results'].append({**instance, **result})
+    return report
+
+def summary(report: dict[str, Any]) -> str:
+    """
+    Table of the mean time in milliseconds of every engine, one row per grid and dirty count.
+    """
+    engines = list(dict.fromkeys(result['engine'] for result in report['results']))
+    times: dict[tuple, dict[str, list[float]]] = {}
+    for result in report['results']:
+        row = (tuple(result['grid_dim']), result['dirty'])
+        times.setdefault(row, {}).setdefault(result['engine'], []).append(result['time_s'] * 1000)
+
+    lines = [f"{'grid':>11} {'dirty':>5} " + ' '.join(f"{engine:>12}" for engine in engines)]
+    for (grid_dim, dirty_no), engine_times in times.items():
+        lines.append(f"{grid_dim[0]:>5}x{grid_dim[1]:<5} {dirty_no:>5} " +
+                     ' '.join(f"{statistics.mean(engine_times[engine]):>12.2f}" for engine in engines))
+    return '\n'.join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the vacuum planner.")
+    parser.add_argument('--grids', nargs='+', default=['10x10', '50x50', '200x200'],
+                        help="grid dimensions as ROWSxCOLUMNS")
+    parser.add_argument('--dirty', nargs='+', type=int, default=[4, 8, 10], help="dirty cell counts")
+    parser.add_argument('--placements', nargs='+', choices=('corner', 'center', 'random'),
+                        default=['corner', 'center', 'random'], help="start placements")
+    parser.add_argument('--engines', nargs='+', choices=list(ENGINES), default=list(ENGINES))
+    parser.add_argument('--repeats', type=int, default=3, help="instances for every combination")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-iter', type=int, default=100000)
+    parser.add_argument('--no-memory', action='store_true', help="skip the peak memory runs")
+    parser.add_argument('-o', '--output', default='-', help="JSON file for the report, stdout by default")
+    args = parser.parse_args(argv)
+
+    grids = [tuple(int(size) for size in grid.lower().split('x')) for grid in args.grids]
+    report = run_benchmark(grids, args.dirty, args.placements, args.engines,
+                           repeats=args.repeats, seed=args.seed, max_iter=args.max_iter,
+                           memory=not args.no_memory)
+    print(summary(report), file=sys.stderr)
+    if args.output == '-': json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as output_file: json.dump(report, output_file, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+Differential check of every solver engine on the same random instances.
+
+Vacuum engines must all find the optimal cost (anytime engines may only do worse, never
+better), and every cleaning order is checked by walking it step by step and adding up
+its cost independently of the engines, with the same rules as get_fullpath: moving costs
+1, and cleaning costs 1 plus the number of moves made so far. Dijkstra engines must find
+the same distances, and every path must be made of edges of the graph and add up to its
+distance.
+
+The total time of each engine is compared with a stored baseline and the run fails when
+an engine is slower than the baseline by more than the tolerance. Save a baseline on the
+machine that runs the check with --save-baseline.
+
+Usage: python differential.py --instances 200 --baseline differential_baseline.json
+"""
+import argparse, json, math, os.path as osp, random, sys, tempfile, time
+
+sys.path.append(osp.join(osp.dirname(osp.abspath(__file__)), '..', 'Dijkstra'))
+from Node import from_csv
+from dijkstra import dijkstra, dijkstra_multi_target, _construct_path, available_backends
+from CSRGraph import CSRGraph, dijkstra_csr, csr_path
+from delta_stepping import delta_stepping
+from all_pairs import all_pairs
+
+from algorithm import astar_vacuum, held_karp_vacuum
+from Cell import Position, chebyshev_distance
+from DistanceTable import DistanceTable
+from PlannerSession import PlannerSession, cheapest_insertion
+
+from typing import Callable, Optional
+
+DEFAULT_BASELINE: str = osp.join(osp.dirname(osp.abspath(__file__)), 'differential_baseline.json')
+# graphs every Dijkstra engine is run on besides the random ones. The demo graph has an
+# edge of weight 0, which from_csv keeps as an edge.
+FIXED_GRAPHS: tuple[str, ...] = (
+    osp.join(osp.dirname(osp.abspath(__file__)), '..', 'Dijkstra', 'demo_data', 'Graph.csv'),)
+
+
+# vacuum engines return the cost and the cleaning order
+vacuum_engine = Callable[[tuple[int, int], Position, set[Position]], tuple[float, list[Position]]]
+
+def _astar(grid_dim, start, dirty_cells):
+    goal, traceback = astar_vacuum(dirty_cells, start, do_traceback=True)
+    return goal.cost, [cell.position for cell in traceback[1:]]
+
+def _astar_table(grid_dim, start, dirty_cells):
+    table = DistanceTable(grid_dim, [], [start, *dirty_cells])
+    goal, traceback = astar_vacuum(dirty_cells, start, do_traceback=True, metric=table)
+    return goal.cost, [cell.position for cell in traceback[1:]]
+
+def _held_karp(grid_dim, start, dirty_cells):
+    goal, traceback = held_karp_vacuum(dirty_cells, start, do_traceback=True)
+    return goal.cost, [cell.position for cell in traceback[1:]]
+
+def _session(grid_dim, start, dirty_cells):
+    session = PlannerSession(start, dirty_cells)
+    return session.cost, session.order
+
+def _insertion(grid_dim, start, dirty_cells):
+    order = []
+    for cell in sorted(dirty_cells):
+        order = cheapest_insertion(start, order, cell, chebyshev_distance)
+    return walk_cost(start, order), order
+
+# exact engines must agree on the optimal cost
+EXACT_VACUUM_ENGINES: dict[str, vacuum_engine] = {
+    'astar': _astar, 'astar_table': _astar_table, 'held_karp': _held_karp, 'session': _session}
+# anytime engines return a valid plan that may cost more than the optimum
+ANYTIME_VACUUM_ENGINES: dict[str, vacuum_engine] = {'insertion': _insertion}
+
+
+# Dijkstra engines return the distances from source to every node id and a path function
+graph_engine = Callable[[str, str, list[str]], tuple[dict[str, float], Callable[[str], list[str]]]]
+
+def _object(filename, source, node_ids, do_UCS: bool = True, backend: str = 'python'):
+    nodes, adjacency_matrix = from_csv(filename)
+    distances, paths = {}, {}
+    for target in node_ids:
+        distance, path = dijkstra(nodes, adjacency_matrix, nodes[source][1], nodes[target][1],
+                                  do_UCS=do_UCS, backend=backend)
+        distances[target] = distance
+        paths[target] = [node.id for node in path]
+    return distances, paths.__getitem__
+
+def _object_full(filename, source, node_ids):
+    return _object(filename, source, node_ids, do_UCS=False)
+
+def _array_backend(filename, source, node_ids):
+    return _object(filename, source, node_ids, backend='array')
+
+def _scipy_backend(filename, source, node_ids):
+    return _object(filename, source, node_ids, backend='scipy')
+
+def _multi_target(filename, source, node_ids):
+    nodes, adjacency_matrix = from_csv(filename)
+    source_node = nodes[source][1]
+    distances, previous = dijkstra_multi_target(nodes, adjacency_matrix, source_node,
+                                                [nodes[node_id][1] for node_id in node_ids])
+    def path(target: str) -> list[str]:
+        return [node.id for node in _construct_path(previous, source_node, nodes[target][1])]
+    return distances, path
+
+def _csr(filename, source, node_ids, search: Callable = dijkstra_csr):
+    graph = CSRGraph.from_csv(filename)
+    distances, previous = search(graph, graph.index(source))
+    def path(target: str) -> list[str]:
+        return [graph.node_ids[i] for i in csr_path(previous, graph.index(source), graph.index(target))]
+    return {node_id: float(distances[graph.index(node_id)]) for node_id in node_ids}, path
+
+def _delta(filename, source, node_ids):
+    return _csr(filename, source, node_ids, search=delta_stepping)
+
+def _csr_adjacency(filename, source, node_ids):
+    nodes, adjacency_matrix = from_csv(filename)
+    graph = CSRGraph.from_adjacency(nodes, adjacency_matrix)
+    distances, previous = dijkstra_csr(graph, graph.index(source))
+    def path(target: str) -> list[str]:
+        return [graph.node_ids[i] for i in csr_path(previous, graph.index(source), graph.index(target))]
+    return {node_id: float(distances[graph.index(node_id)]) for node_id in node_ids}, path
+
+GRAPH_ENGINES: dict[str, graph_engine] = {
+    'object': _object, 'object_full': _object_full, 'multi_target': _multi_target, 'csr': _csr,
+    'array_backend': _array_backend, 'delta': _delta, 'csr_adjacency': _csr_adjacency}
+if 'scipy' in available_backends(): GRAPH_ENGINES['scipy_backend'] = _scipy_backend
+# methods of all_pairs, whose row of the source must match the distances of the engines
+ALL_PAIRS_METHODS: tuple[str, ...] = ('floyd', 'dijkstra')
+
+
+def walk_cost(start: Position, order: list[Position]) -> int:
+    """
+    The cost of cleaning cells in order, found by walking every step of the robot.
+    Raises ValueError if the robot would move more than one cell at a time.
+    """
+    steps = [tuple(start)]
+    for target in order:
+        x, y = steps[-1]
+        while (x, y) != tuple(target):
+            x += (target[0] > x) - (target[0] < x)
+            y += (target[1] > y) - (target[1] < y)
+            steps.append((x, y))
+        # cleaning shows up as staying in the same cell
+        steps.append((x, y))
+
+    cost, clean_cost = 0, 1
+    for prev, cur in zip(steps, steps[1:]):
+        if max(abs(cur[0] - prev[0]), abs(cur[1] - prev[1])) > 1:
+            raise ValueError(f"The robot jumps from {prev} to {cur}")
+        if prev == cur: cost += clean_cost
+        else:
+            cost += 1
+            clean_cost += 1
+    return cost
+
+def random_vacuum_instance(rng: random.Random, max_cells: int) -> tuple[tuple[int, int], Position, set[Position]]:
+    rows, columns = rng.randint(1, 15), rng.randint(1, 15)
+    cells = {Position(rng.randint(1, columns), rng.randint(1, rows))
+             for _ in range(rng.randint(0, max_cells))}
+    return (rows, columns), Position(rng.randint(1, columns), rng.randint(1, rows)), cells
+
+def write_random_graph(rng: random.Random, node_no: int, filename: str) -> None:
+    """
+    A connected random graph: a random spanning tree plus extra edges, integer weights
+    from 0, so that zero-weight edges are checked as well.
+    """
+    with open(filename, 'w') as csvfile:
+        for node in range(1, node_no):
+            csvfile.write(f"{node},{rng.randrange(node)},{rng.randint(0, 20)}\n")
+        for _ in range(node_no * 2):
+            node_from, node_to = rng.sample(range(node_no), 2)
+            csvfile.write(f"{node_from},{node_to},{rng.randint(0, 20)}\n")
+
+
+def check_vacuum(instances: int, seed: int, max_cells: int) -> tuple[list[str], dict[str, float]]:
+    """
+    Run every vacuum engine on random instances. Returns the failures and the total
+    time of each engine.
+    """
+    rng = random.Random(seed)
+    failures = []
+    times = dict.fromkeys([*EXACT_VACUUM_ENGINES, *ANYTIME_VACUUM_ENGINES], 0.0)
+    for number in range(instances):
+        grid_dim, start, dirty_cells = random_vacuum_instance(rng, max_cells)
+        name = f"vacuum #{number} start={tuple(start)} dirty={sorted(map(tuple, dirty_cells))}"
+        costs = {}
+        for engine, solve in {**EXACT_VACUUM_ENGINES, **ANYTIME_VACUUM_ENGINES}.items():
+            begin = time.perf_counter()
+            cost, order = solve(grid_dim, start, set(dirty_cells))
+            times[engine] += time.perf_counter() - begin
+            costs[engine] = cost
+
+            if sorted(order) != sorted(dirty_cells):
+                failures.append(f"{name}: {engine} does not clean every dirty cell once")
+                continue
+            try: walked = walk_cost(start, order)
+            except ValueError as error:
+                failures.append(f"{name}: {engine} gives an invalid path, {error}")
+                continue
+            if walked != cost:
+                failures.append(f"{name}: {engine} reports cost {cost}, its path costs {walked}")
+
+        optimum = min(costs[engine] for engine in EXACT_VACUUM_ENGINES)
+        for engine in EXACT_VACUUM_ENGINES:
+            if costs[engine] != optimum:
+                failures.append(f"{name}: {engine} finds cost {costs[engine]}, optimum is {optimum}")
+        for engine in ANYTIME_VACUUM_ENGINES:
+            if costs[engine] < optimum:
+                failures.append(f"{name}: anytime {engine} finds cost {costs[engine]} below optimum {optimum}")
+    return failures, times
+
+def check_graphs(graphs: int, seed: int, node_no: int) -> tuple[list[str], dict[str, float]]:
+    """
+    Run every Dijkstra engine from a random source of FIXED_GRAPHS and of random graphs.
+    Returns the failures and the total time of each engine.
+    """
+    rng = random.Random(seed)
+    failures = []
+    times = dict.fromkeys([*GRAPH_ENGINES, *(f"all_pairs_{method}" for method in ALL_PAIRS_METHODS)], 0.0)
+    with tempfile.TemporaryDirectory() as data_dir:
+        filenames = list(FIXED_GRAPHS)
+        for number in range(graphs):
+            filenames.append(osp.join(data_dir, f"graph_{number}.csv"))
+            write_random_graph(rng, node_no, filenames[-1])
+
+        for filename in filenames:
+            nodes, adjacency_matrix = from_csv(filename)
+            node_ids = list(nodes)
+            source = rng.choice(node_ids)
+            name = f"graph {osp.basename(filename)} source={source}"
+
+            results = {}
+            for engine, solve in GRAPH_ENGINES.items():
+                begin = time.perf_counter()
+                results[engine] = solve(filename, source, node_ids)
+                times[engine] += time.perf_counter() - begin
+
+            reference = next(iter(results))
+            for engine, (distances, path) in results.items():
+                for target in node_ids:
+                    if not math.isclose(distances[target], results[reference][0][target]):
+                        failures.append(f"{name}: {engine} finds distance {distances[target]} to {target}, "
+                                        f"{reference} finds {results[reference][0][target]}")
+                        break
+                    nodes_on_path = path(target)
+                    # the source is one of the targets, every engine must give it a path of itself
+                    if target == source and nodes_on_path != [source]:
+                        failures.append(f"{name}: {engine} gives path {nodes_on_path} from {source} to itself")
+                        break
+                    if not nodes_on_path or nodes_on_path[0] != source or nodes_on_path[-1] != target:
+                        failures.append(f"{name}: {engine} gives no path from {source} to {target}")
+                        break
+                    # a weight of 0 in the matrix may be an edge, only neighbours tell
+                    edges = list(zip(nodes_on_path, nodes_on_path[1:]))
+                    weights = [adjacency_matrix[nodes[node_from][0]][nodes[node_to][0]]
+                               for node_from, node_to in edges]
+                    if any(not nodes[node_to][1] in nodes[node_from][1].neighbours
+                           for node_from, node_to in edges) or\
+                       not math.isclose(sum(weights), distances[target], abs_tol=1e-9):
+                        failures.append(f"{name}: {engine} gives a path to {target} that is not "
+                                        f"a path of length {distances[target]}")
+                        break
+
+            graph = CSRGraph.from_adjacency(nodes, adjacency_matrix)
+            for method in ALL_PAIRS_METHODS:
+                begin = time.perf_counter()
+                row = all_pairs(graph, method=method, workers=1)[graph.index(source)]
+                times[f"all_pairs_{method}"] += time.perf_counter() - begin
+                for target in node_ids:
+                    # the matrix is float32
+                    if not math.isclose(row[graph.index(target)], results[reference][0][target], rel_tol=1e-6):
+                        failures.append(f"{name}: all_pairs {method} finds distance "
+                                        f"{row[graph.index(target)]} to {target}, "
+                                        f"{reference} finds {results[reference][0][target]}")
+                        break
+    return failures, times
+
+def check_speed(times: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    """Engines slower than their baseline time by more than tolerance (0.5 is 50%)"""
+    return [f"{engine} takes {seconds:.3f}s, baseline is {baseline[engine]:.3f}s"
+            for engine, seconds in times.items()
+            if engine in baseline and seconds > baseline[engine] * (1 + tolerance)]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check that every solver engine agrees.")
+    parser.add_argument('--instances', type=int, default=200, help="number of vacuum instances")
+    parser.add_argument('--max-cells', type=int, default=8, help="maximum dirty cells of an instance")
+    parser.add_argument('--graphs', type=int, default=20, help="number of random graphs")
+    parser.add_argument('--nodes', type=int, default=200, help="number of nodes of every graph")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE,
+                        help="JSON file of engine times to compare with, skipped if it does not exist")
+    parser.add_argument('--tolerance', type=float, default=0.5,
+                        help="allowed slowdown against the baseline, 0.5 is 50%%")
+    parser.add_argument('--save-baseline', action='store_true', help="write the times of this run as baseline")
+    args = parser.parse_args(argv)
+
+    vacuum_failures, vacuum_times = check_vacuum(args.instances, args.seed, args.max_cells)
+    graph_failures, graph_times = check_graphs(args.graphs, args.seed, args.nodes)
+    failures = vacuum_failures + graph_failures
+    times = {**vacuum_times, **graph_times}
+    for engine, seconds in times.items():
+        print(f"{engine:>14}: {seconds:.3f}s", file=sys.stderr)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file: json.dump(times, baseline_file, indent=2)
+    elif osp.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            failures += check_speed(times, json.load(baseline_file), args.tolerance)
+
+    for failure in failures: print(failure, file=sys.stderr)
+    print(f"{len(failures)} failures", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
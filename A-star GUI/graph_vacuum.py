@@ -0,0 +1,163 @@
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from math import inf
+import os.path as osp, sys
+
+sys.path.append(osp.join(osp.dirname(osp.abspath(__file__)), '..', 'Dijkstra'))
+from Node import Node, from_csv
+from dijkstra import dijkstra_multi_target, _construct_path
+
+from algorithm import astar_vacuum
+from Cell import Position, Cell
+
+from typing import Iterable, Optional
+
+
+# number of searches kept in _distance_cache, each holds a previous node id for every
+# node it reached
+DISTANCE_CACHE_SIZE: int = 128
+
+# (graph file, modification time, source id) -> (distances to targets, previous node ids),
+# least recently used first
+_distance_cache: dict[tuple[str, float, str], tuple[dict[str, float], dict[str, str]]] = {}
+
+
+@lru_cache(maxsize=8)
+def _load_graph(filename: str, mtime: float) -> tuple[dict[str, tuple[int, Node]], list[list[float]]]:
+    # mtime is only part of the cache key, so that a changed file gets parsed again
+    return from_csv(filename)
+
+def _single_source(filename: str, mtime: float, source_id: str,
+                   target_ids: list[str]) -> tuple[dict[str, float], dict[str, str]]:
+    nodes, adjacency_matrix = _load_graph(filename, mtime)
+    distances, previous = dijkstra_multi_target(nodes, adjacency_matrix, nodes[source_id][1],
+                                                [nodes[target_id][1] for target_id in target_ids])
+    # node ids instead of Node objects, pickling a Node pickles the whole graph with it
+    return distances, {node_id: node.id for node_id, node in previous.items()}
+
+
+class GraphDistances:
+    """
+    Pairwise shortest distances between key nodes (usually the start and the dirty nodes)
+    of a weighted graph loaded with from_csv.
+
+    Each key node is given a stand-in Position (index, 1) so that Cell and astar_vacuum
+    can search over the graph unchanged. A GraphDistances is callable with two of these
+    positions and can be passed as `metric` of astar_vacuum.
+
+    # Attributes:
+    nodes, adjacency_matrix: the graph as returned by from_csv\
+
+    node_ids (list[str]): the ids of the key nodes\
+
+    distances (list[list[float]]): distances[i][j] is the shortest distance from node_ids[i]
+    to node_ids[j]
+    """
+    __slots__ = 'nodes', 'adjacency_matrix', 'node_ids', 'distances', '_index', '_previous'
+    def __init__(self, filename: str, node_ids: Iterable[str], *,
+                 max_workers: Optional[int] = None) -> None:
+        """
+        Load the graph and find the distances between key nodes. One multi-target Dijkstra
+        search is run for every key node, in parallel. Results are cached for as long as
+        the graph file does not change.
+
+        ## Parameters:
+        filename (str): path to the graph's csv file\n
+        node_ids (Iterable[str]): ids of the key nodes\n
+        max_workers (int | None): number of processes used, by default the number of CPUs
+
+        ## Raises:
+        KeyError if a node is not in the graph\n
+        ValueError if a key node cannot be reached from another
+        """
+        filename = osp.abspath(filename)
+        mtime = osp.getmtime(filename)
+        self.nodes, self.adjacency_matrix = _load_graph(filename, mtime)
+        self.node_ids: list[str] = list(dict.fromkeys(node_ids))
+        self._index: dict[str, int] = {}
+        for i, node_id in enumerate(self.node_ids):
+            if not node_id in self.nodes:
+                raise KeyError(f"There is no node '{node_id}' in the graph")
+            self._index[node_id] = i
+
+        found, missing = {}, []
+        for node_id in self.node_ids:
+            cached = _distance_cache.pop((filename, mtime, node_id), None)
+            if cached is None or any(not target_id in cached[0] for target_id in self.node_ids):
+                missing.append(node_id)
+            else: found[node_id] = cached
+        if missing:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = executor.map(_single_source,
+                                       [filename] * len(missing), [mtime] * len(missing),
+                                       missing, [self.node_ids] * len(missing))
+                found.update(zip(missing, results))
+
+        # searches on an older version of the file are never used again
+        for key in [key for key in _distance_cache if key[0] == filename and key[1] != mtime]:
+            del _distance_cache[key]
+        for node_id, result in found.items():
+            _distance_cache[(filename, mtime, node_id)] = result
+        while len(_distance_cache) > DISTANCE_CACHE_SIZE:
+            del _distance_cache[next(iter(_distance_cache))]
+
+        self.distances: list[list[float]] = []
+        self._previous: list[dict[str, Node]] = []
+        for source_id in self.node_ids:
+            distances, previous = found[source_id]
+            self.distances.append([distances.get(target_id, inf) for target_id in self.node_ids])
+            self._previous.append({node_id: self.nodes[prev_id][1]
+                                   for node_id, prev_id in previous.items()})
+            for target_id, dist in zip(self.node_ids, self.distances[-1]):
+                if dist is inf:
+                    raise ValueError(f"Node '{target_id}' cannot be reached from '{source_id}'")
+
+    def position(self, node_id: str) -> Position:
+        """The stand-in position of a key node"""
+        return Position(self._index[node_id] + 1, 1)
+
+    def node(self, position: Position) -> Node:
+        """The key node of a stand-in position"""
+        return self.nodes[self.node_ids[position.x - 1]][1]
+
+    def __call__(self, point1: Position, point2: Position) -> float:
+        return self.distances[point1.x - 1][point2.x - 1]
+
+    def move(self, start: Position, end: Position) -> list[Node]:
+        """
+        Return the nodes on a shortest path between two key nodes, including both ends.
+        """
+        source, target = self.node(start), self.node(end)
+        if source == target: return [source]
+        return _construct_path(self._previous[start.x - 1], source, target)
+
+
+def astar_graph_vacuum(filename: str, dirty_nodes: Iterable[str], start: str, *,
+                       max_iter: int = 100000,
+                       max_workers: Optional[int] = None)\
+                      -> tuple[Optional[Cell], Optional[list[Node]]]:
+    """
+    Solve the vacuum problem on a weighted graph, where the robot has to clean every dirty node.
+    Moving costs the weight of the edges and cleaning costs 1 plus the distance moved so far.
+
+    ## Parameters:
+    \tfilename: path to the graph's csv file, see from_csv\
+    \tdirty_nodes: ids of the dirty nodes\
+    \tstart: id of the node the robot starts at\
+    \tmax_iter: maximum number of iterations of astar_vacuum\
+    \tmax_workers: number of processes used to find the distances between nodes
+    ## Returns:
+    \tA tuple of the goal state and the nodes the robot goes through, in order.
+    Both are None if no solution was found within max_iter iterations.
+    """
+    dirty_nodes = list(dirty_nodes)
+    graph = GraphDistances(filename, [start, *dirty_nodes], max_workers=max_workers)
+    goal, traceback = astar_vacuum([graph.position(node_id) for node_id in dirty_nodes],
+                                   graph.position(start), max_iter=max_iter,
+                                   metric=graph, do_traceback=True)
+    if goal is None: return None, None
+
+    path = [graph.node(traceback[0].position)]
+    for i, cell in enumerate(traceback[:-1]):
+        path.extend(graph.move(cell.position, traceback[i + 1].position)[1:])
+    return goal, path
@@ -1,18 +1,23 @@
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QFont
+from PyQt6.QtCore import Qt, QTimer, QThread, pyqtSignal
+from PyQt6.QtGui import QFont, QKeySequence, QShortcut
 import PyQt6.QtWidgets as QtWidgets
 
 
 import matplotlib
 matplotlib.use('QtAgg')
 
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg, NavigationToolbar2QT
+from matplotlib.colors import ListedColormap
 from matplotlib.figure import Figure
+from matplotlib.ticker import MaxNLocator
 
 
-import random as rand, math
+import random as rand, math, time
+import os.path as osp
+import numpy as np
 
-from algorithm import Position, astar_vacuum, chebyshev_move
+from algorithm import Position, SearchSnapshot, astar_vacuum, expand_path, replay_order
+from PlanCache import PlanCache
 
 
 from typing import Literal
@@ -38,12 +43,16 @@ EDIT_TAB_INSTRUCTION_TXT = """1. Add Cell - Thêm ô dơ
     Cú pháp nhập: (x, y) - x, y là số dòng và số cột của ma trận.
     Thao tác: Nhập kích thước mới, sau đó nhấn vào nút Change Dimension.
     
-5. Clear - Xóa tất cả ô dơ trong ma trận"""
+5. Clear - Xóa tất cả ô dơ trong ma trận
+
+6. Undo / Redo - Hoàn tác / làm lại thao tác chỉnh sửa (Ctrl+Z / Ctrl+Y)"""
 HOME_INSTRUCTION_TXT = """1. Place - Đặt vị trí bắt đầu của robot
     Cú pháp nhập: (x, y) - x, y lần lượt là vị trí hàng và cột trong ma trận của robot.
     Thao tác: Nhập tọa độ, sau đó nhấn vào nút Add Cell. Người dùng có thể nhập 'r' để chỉ định vị trí ngẫu nhiên.
 
-2. Run - Chạy A* và hiển thị đường đi ngắn nhất để dọn các ô dơ"""
+2. Run - Chạy A* và hiển thị đường đi ngắn nhất để dọn các ô dơ
+
+3. Cancel - Dừng việc tìm đường đi đang chạy"""
 
 
 DIRTY_CELL_COLOUR: tuple[float] = (1, 0, 0, .5)
@@ -57,7 +66,27 @@ ROBOT_MARKERSIZE: float = 10
 PATH_COLOUR: tuple[float] = (0, 0, 1, .2)
 PATH_MARKER: str = '--'
 
+SEARCH_HEATMAP_CMAP: str = 'YlOrRd'
+SEARCH_HEATMAP_ALPHA: float = .6
+# maximum number of search snapshots drawn per second
+SNAPSHOT_RATE: float = 20
+
+# grids with more cells than this draw dirty cells as an image instead of markers
+RASTER_THRESHOLD: int = 50 * 50
+# gridlines and a tick for every cell are only drawn when at most this many cells are in view
+GRIDLINE_MAX_CELLS: int = 60
+# the image of a large grid is downsampled to at most this many pixels along each side
+RASTER_MAX_PIXELS: int = 800
+
 MAX_ITER = 200_000
+# seconds before the search is given up
+TIME_LIMIT: float = 60
+
+# solved plans are cached by grid configuration and kept between sessions
+PLAN_CACHE_SIZE: int = 64
+PLAN_CACHE_FILE: str = osp.join(osp.expanduser('~'), '.vacuum_robot_plans.json')
+# maximum number of edits that can be undone
+MAX_UNDO: int = 100
 
 
 move_rate: float = 500
@@ -65,9 +94,25 @@ move_rate: float = 500
 grid_dim: list[int, int] = [5, 5]
 dirty_cells: set[Position] = set()
 start: list[int, int] = [0, 0]
-path: list[Position] = []
+# xs, ys, clean costs and current costs of every step of the solution, empty if not solved yet
+path: list[np.ndarray] = []
 min_cost: int = 0
+plan_cache = PlanCache(PLAN_CACHE_SIZE, PLAN_CACHE_FILE)
+
 
+def refresh_plan():
+    """
+    Load the cached plan of the current grid configuration, or clear the path if there is none.
+    """
+    global path, total_cost
+    plan = None
+    if (start[0] != 0) and (start[1] != 0):
+        plan = plan_cache.get(grid_dim, start, dirty_cells)
+
+    if plan is None: path = []
+    else:
+        total_cost, order = plan
+        path = list(expand_path(replay_order(Position(*start), order)))
 
 def format_cost_text(clean_cost: int, current_cost: int, total_cost: int) -> str:
     return f"Clean cost: {clean_cost:<15}" +\
@@ -85,7 +130,8 @@ def update_markersize(canvas: 'MplCanvas')\
     width, height = width / grid_dim[1], height / grid_dim[0]
     cell_area = width * height
 
-    ROBOT_MARKERSIZE = math.sqrt(.05 * cell_area)
+    # keep the robot visible on very large grids
+    ROBOT_MARKERSIZE = max(math.sqrt(.05 * cell_area), 4)
     DIRTY_CELL_MARKERSIZE = math.sqrt(.13 * cell_area)
 
 def setup_grid(ax, rows: int, columns: int):
@@ -93,14 +139,159 @@ def setup_grid(ax, rows: int, columns: int):
 
     ax.set_xlim(.5, columns + .5)
     ax.set_ylim(.5, rows + .5)
-    ax.set_xticks(range(1, columns + 1))
-    ax.set_yticks(range(1, rows + 1))
     ax.tick_params(left=False, bottom=False)
 
-    ax.vlines([i + .5 for i in range(0, columns + 1)],
-              ymin=0, ymax=rows + 1, colors=(0, 0, 0, 0.2))
-    ax.hlines([i + .5 for i in range(0, rows + 1)],
-              xmin=0, xmax=columns + 1, colors=(0, 0, 0, 0.2))
+    draw_gridlines(ax)
+    # redraw gridlines for the visible part of the grid when zooming or panning
+    ax.callbacks.connect('xlim_changed', draw_gridlines)
+    ax.callbacks.connect('ylim_changed', draw_gridlines)
+
+def draw_gridlines(ax):
+    """
+    Draw gridlines and ticks of the cells in view. When zoomed out too far,
+    only a few ticks are drawn and no gridlines, so large grids stay fast to draw.
+    """
+    for line in ax.collections[:]:
+        if line.get_gid() == 'gridline': line.remove()
+
+    x_min, x_max = ax.get_xlim()
+    y_min, y_max = ax.get_ylim()
+    if (x_max - x_min > GRIDLINE_MAX_CELLS) or (y_max - y_min > GRIDLINE_MAX_CELLS):
+        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+        return
+
+    columns = range(max(math.ceil(x_min), 1), math.floor(x_max) + 1)
+    rows = range(max(math.ceil(y_min), 1), math.floor(y_max) + 1)
+    ax.set_xticks(columns)
+    ax.set_yticks(rows)
+    ax.vlines([i - .5 for i in columns] + [columns.stop - .5],
+              ymin=y_min, ymax=y_max, colors=(0, 0, 0, 0.2), gid='gridline')
+    ax.hlines([i - .5 for i in rows] + [rows.stop - .5],
+              xmin=x_min, xmax=x_max, colors=(0, 0, 0, 0.2), gid='gridline')
+
+def random_free_cells(no_cells: int, occupied: set[Position]) -> list[Position]:
+    """
+    Pick random cells of the grid that are not occupied, without listing every cell of the grid
+    unless most of the free cells are picked.
+    """
+    rows, columns = grid_dim
+    free_no = rows * columns - len(occupied)
+    if 2 * no_cells >= free_no:
+        avail_spaces = [pos for i in range(1, columns + 1) for j in range(1, rows + 1)
+                        if not (pos := Position(i, j)) in occupied]
+        return rand.sample(avail_spaces, no_cells)
+
+    new_cells = set()
+    while len(new_cells) < no_cells:
+        index = rand.randrange(rows * columns)
+        pos = Position(index % columns + 1, index // columns + 1)
+        if not pos in occupied: new_cells.add(pos)
+    return list(new_cells)
+
+
+class DirtyCellsLayer:
+    """
+    Draw dirty cells on a grid. Small grids draw a marker for each dirty cell.
+    Grids with more than RASTER_THRESHOLD cells draw an image of an array with
+    one pixel per cell instead, so adding or removing a cell only changes one pixel.
+    Only the part of the array in view is drawn, downsampled when zoomed out.
+    """
+    def __init__(self, ax, rows: int, columns: int, cells: set[Position]) -> None:
+        self.ax = ax
+        self.raster = rows * columns > RASTER_THRESHOLD
+        if self.raster:
+            self.grid = np.zeros((rows, columns), dtype=np.uint8)
+            for pos in cells: self.grid[pos.y - 1, pos.x - 1] = 1
+            self.artist = ax.imshow(self.grid, cmap=ListedColormap([(0, 0, 0, 0), DIRTY_CELL_COLOUR]),
+                                    vmin=0, vmax=1, origin='lower', interpolation='nearest',
+                                    extent=(.5, columns + .5, .5, rows + .5), aspect='auto')
+            self.update_view()
+            ax.callbacks.connect('xlim_changed', self.update_view)
+            ax.callbacks.connect('ylim_changed', self.update_view)
+        else:
+            self.artist, = ax.plot([pos.x for pos in cells], [pos.y for pos in cells],
+                                   DIRTY_CELL_MARKER, color=DIRTY_CELL_COLOUR,
+                                   markersize=DIRTY_CELL_MARKERSIZE)
+
+    def update_view(self, ax=None) -> None:
+        x_min, x_max = self.ax.get_xlim()
+        y_min, y_max = self.ax.get_ylim()
+        rows, columns = self.grid.shape
+        # array indices of the cells in view
+        col_start, col_stop = max(math.floor(x_min - .5), 0), min(math.ceil(x_max - .5), columns)
+        row_start, row_stop = max(math.floor(y_min - .5), 0), min(math.ceil(y_max - .5), rows)
+        view = self.grid[row_start:max(row_stop, row_start + 1), col_start:max(col_stop, col_start + 1)]
+
+        step = max(-(-view.shape[0] // RASTER_MAX_PIXELS), -(-view.shape[1] // RASTER_MAX_PIXELS))
+        if step > 1:
+            # a pixel is dirty if any cell it covers is dirty
+            height, width = -(-view.shape[0] // step), -(-view.shape[1] // step)
+            padded = np.zeros((height * step, width * step), dtype=np.uint8)
+            padded[:view.shape[0], :view.shape[1]] = view
+            view = padded.reshape(height, step, width, step).max(axis=(1, 3))
+
+        self.artist.set_data(view)
+        self.artist.set_extent((col_start + .5, col_start + .5 + view.shape[1] * step,
+                                row_start + .5, row_start + .5 + view.shape[0] * step))
+
+    def add(self, cells: list[Position]) -> None:
+        if self.raster:
+            for pos in cells: self.grid[pos.y - 1, pos.x - 1] = 1
+            self.update_view()
+        else:
+            self.artist.set_data(np.append(self.artist.get_xdata(), [pos.x for pos in cells]),
+                                 np.append(self.artist.get_ydata(), [pos.y for pos in cells]))
+
+    def remove(self, cells: list[Position]) -> None:
+        if self.raster:
+            for pos in cells: self.grid[pos.y - 1, pos.x - 1] = 0
+            self.update_view()
+        else:
+            xs, ys = np.asarray(self.artist.get_xdata()), np.asarray(self.artist.get_ydata())
+            keep = np.ones(len(xs), dtype=bool)
+            for pos in cells: keep &= (xs != pos.x) | (ys != pos.y)
+            self.artist.set_data(xs[keep], ys[keep])
+
+    def clear(self) -> None:
+        if self.raster:
+            self.grid[:] = 0
+            self.update_view()
+        else: self.artist.set_data([], [])
+
+
+class PlannerWorker(QThread):
+    """
+    Run astar_vacuum in a background thread so the window stays responsive.
+    Emits `progress` with (expansions, frontier size, best f-value) and `snapshot` with
+    a SearchSnapshot during the search, and `solved` with the result of astar_vacuum when done.
+    """
+    progress = pyqtSignal(int, int, float)
+    snapshot = pyqtSignal(object)
+    solved = pyqtSignal(object)
+
+    def __init__(self, dirty: set[Position], start: Position,
+                 parent: QtWidgets.QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.dirty = dirty
+        self.start_pos = start
+        self.cancelled = False
+        self.timed_out = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        deadline = time.monotonic() + TIME_LIMIT
+        def report(expansions: int, frontier: int, best_f: float) -> bool:
+            self.progress.emit(expansions, frontier, best_f)
+            self.timed_out = time.monotonic() > deadline
+            return self.cancelled or self.timed_out
+
+        goal = astar_vacuum(self.dirty, self.start_pos, max_iter=MAX_ITER,
+                            do_traceback=True, progress=report,
+                            observer=self.snapshot.emit, observer_rate=SNAPSHOT_RATE)
+        self.solved.emit(goal)
 
 
 class MplCanvas(FigureCanvasQTAgg):
@@ -111,6 +302,41 @@ class MplCanvas(FigureCanvasQTAgg):
         super().__init__(self.fig)
 
 
+class BlitManager:
+    """
+    Redraw only the artists that change (robot, path, dirty cells, ...) on top of
+    a cached image of the static grid, instead of redrawing the whole figure.
+
+    The background is cached every time the canvas is fully drawn, so a full
+    `canvas.draw()` is only needed when the static part changes.
+    """
+    def __init__(self, canvas: MplCanvas) -> None:
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def set_artists(self, artists: list) -> None:
+        for artist in self.artists: artist.set_animated(False)
+        self.artists = list(artists)
+        for artist in self.artists: artist.set_animated(True)
+
+    def on_draw(self, event) -> None:
+        self.background = self.canvas.copy_from_bbox(self.canvas.fig.bbox)
+        self.draw_artists()
+
+    def draw_artists(self) -> None:
+        for artist in self.artists: self.canvas.fig.draw_artist(artist)
+
+    def update(self) -> None:
+        if self.background is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self.background)
+        self.draw_artists()
+        self.canvas.blit(self.canvas.fig.bbox)
+
+
 class ErrorDialog(QtWidgets.QDialog):
     def __init__(self,  msg: str, parent: QtWidgets.QWidget | None = None) -> None:
         super().__init__(parent)
@@ -173,7 +399,7 @@ class Guide(QtWidgets.QWidget):
         home_instruct.setText(HOME_INSTRUCTION_TXT)
         home_instruct.setFont(INSTRUCTION_FONT)
         home_instruct.setAlignment(Qt.AlignmentFlag.AlignJustify)
-        home_instruct.setGeometry(10, 35, 1000, 100)
+        home_instruct.setGeometry(10, 35, 1000, 150)
 
         edit_title = QtWidgets.QLabel(parent=self)
         edit_title.setText("Các nút trong thẻ Edit")
@@ -209,12 +435,18 @@ class Input_Zone(QtWidgets.QWidget):
         random_cell_button = QtWidgets.QPushButton('Randomize', parent=self)
         change_dim_button = QtWidgets.QPushButton('Change Dimension', parent=self)
         clear_button = QtWidgets.QPushButton('Clear', parent=self)
+        undo_button = QtWidgets.QPushButton('Undo', parent=self)
+        redo_button = QtWidgets.QPushButton('Redo', parent=self)
 
         add_cell_button.clicked.connect(lambda: self.handle_input('add'))
         remove_cell_button.clicked.connect(lambda: self.handle_input('remove'))
         random_cell_button.clicked.connect(lambda: self.handle_input('random'))
         change_dim_button.clicked.connect(lambda: self.handle_input('dimension'))
         clear_button.clicked.connect(self.parent().clear_cell)
+        undo_button.clicked.connect(self.parent().undo)
+        redo_button.clicked.connect(self.parent().redo)
+        QShortcut(QKeySequence.StandardKey.Undo, self.parent()).activated.connect(self.parent().undo)
+        QShortcut(QKeySequence.StandardKey.Redo, self.parent()).activated.connect(self.parent().redo)
 
         change_dim_button.setFixedWidth(130)
 
@@ -223,6 +455,8 @@ class Input_Zone(QtWidgets.QWidget):
         hbox.addWidget(random_cell_button)
         hbox2.addWidget(change_dim_button)
         hbox2.addWidget(clear_button)
+        hbox2.addWidget(undo_button)
+        hbox2.addWidget(redo_button)
 
         self.vbox.addLayout(hbox)
         self.vbox.addLayout(hbox2)
@@ -275,20 +509,24 @@ class Edit(QtWidgets.QWidget):
     def __init__(self):
         super().__init__()
 
+        # grid configurations as (grid dimension, start, dirty cells) before each edit
+        self.undo_stack: list[tuple[tuple[int, int], tuple[int, int], frozenset[Position]]] = []
+        self.redo_stack: list[tuple[tuple[int, int], tuple[int, int], frozenset[Position]]] = []
+
         self.input_zone = Input_Zone(parent=self)
         self.init_canvas()
 
 
     def init_canvas(self):
         self.canvas = MplCanvas(width=5, height=4)
+        self.blit = BlitManager(self.canvas)
         setup_grid(self.canvas.axes, *grid_dim)
         update_markersize(self.canvas)
-        self.dirty_cells, = self.canvas.axes.plot([], [],
-                                                  DIRTY_CELL_MARKER,
-                                                  color=DIRTY_CELL_COLOUR,
-                                                  markersize=DIRTY_CELL_MARKERSIZE)
+        self.dirty_layer = DirtyCellsLayer(self.canvas.axes, *grid_dim, dirty_cells)
+        self.blit.set_artists([self.dirty_layer.artist])
 
         plot_box = QtWidgets.QVBoxLayout()
+        plot_box.addWidget(NavigationToolbar2QT(self.canvas, self))
         plot_box.addWidget(self.canvas)
 
         placeholder_wid = QtWidgets.QWidget(parent=self)
@@ -301,80 +539,91 @@ class Edit(QtWidgets.QWidget):
             ErrorDialog(f"Not enough cells to place {no_cells} more dirty cells!").exec()
             return
 
-        avail_spaces = []
-        for i in range(1, grid_dim[1] + 1):
-            for j in range(1, grid_dim[0] + 1):
-                if not (temp := Position(i, j)) in dirty_cells: avail_spaces.append(temp)
-        
-        for new_cell in rand.sample(avail_spaces, no_cells):
-            dirty_cells.add(new_cell)
+        self.record_edit()
+        new_cells = random_free_cells(no_cells, dirty_cells)
+        dirty_cells.update(new_cells)
+        self.dirty_layer.add(new_cells)
+        self.blit.update()
 
-        self.dirty_cells.set_xdata([pos.x for pos in dirty_cells])
-        self.dirty_cells.set_ydata([pos.y for pos in dirty_cells])
-        self.canvas.draw()
-
-        path.clear()
+        refresh_plan()
 
     def add_cell(self, x: int, y: int):
         if (x < 1) or (y < 1) or\
            (x > grid_dim[1]) or (y > grid_dim[0]):
             ErrorDialog(f"Position of dirty must be within the grid dimension!\n({x}, {y}) was given").exec()
         elif (cell := Position(x, y)) in dirty_cells:
-            InfoDialog(f"There is already a dirty cell at ({x, y})").exec()
+            InfoDialog("Cell is already dirty", f"There is already a dirty cell at ({x}, {y})").exec()
         else:
+            self.record_edit()
             dirty_cells.add(cell)
+            self.dirty_layer.add([cell])
+            self.blit.update()
 
-            self.dirty_cells.set_xdata([pos.x for pos in dirty_cells])
-            self.dirty_cells.set_ydata([pos.y for pos in dirty_cells])
-            self.canvas.draw()
-
-        path.clear()
+        refresh_plan()
 
     def remove_cell(self, x: int, y: int):
         if not (cell := Position(x, y)) in dirty_cells:
             ErrorDialog(f"There is no dirty cell at position {cell} to remove!").exec()
+            return
 
+        self.record_edit()
         dirty_cells.remove(cell)
-        self.dirty_cells.set_xdata([pos.x for pos in dirty_cells])
-        self.dirty_cells.set_ydata([pos.y for pos in dirty_cells])
-        self.canvas.draw()
+        self.dirty_layer.remove([cell])
+        self.blit.update()
 
-        path.clear()
+        refresh_plan()
 
     def change_dim(self, rows: int, columns: int):
         if rows < 1 or columns < 1:
             ErrorDialog(f"Rows and columns must be non-zero! ({rows}, {columns}) was given").exec()
             return
         
-        global dirty_cells
-        grid_dim[0], grid_dim[1] = rows, columns
-
-        changed = False
-        if (start[1] > grid_dim[0]) or (start[0] > grid_dim[1]):
-            start[0], start[1] = 0, 0
-            changed = True
-        
+        self.record_edit()
         new_dirty = set()
         for cell in dirty_cells:
-            if (cell.x <= grid_dim[1]) and (cell.y <= grid_dim[0]):
+            if (cell.x <= columns) and (cell.y <= rows):
                 new_dirty.add(cell)
-                changed = True
-        dirty_cells = new_dirty
-
-        if changed: path.clear()
-        
-        setup_grid(self.canvas.axes, rows, columns)
-        update_markersize(self.canvas)
-        self.dirty_cells, = self.canvas.axes.plot([pos.x for pos in dirty_cells], [pos.y for pos in dirty_cells],
-                                                  DIRTY_CELL_MARKER, color=DIRTY_CELL_COLOUR,
-                                                  markersize=DIRTY_CELL_MARKERSIZE)
-        self.canvas.draw()
+        self.restore((rows, columns), tuple(start), new_dirty)
 
     def clear_cell(self):
+        self.record_edit()
         dirty_cells.clear()
-        path.clear()
-        self.dirty_cells.set_xdata([pos.x for pos in dirty_cells])
-        self.dirty_cells.set_ydata([pos.y for pos in dirty_cells])
+        self.dirty_layer.clear()
+        self.blit.update()
+        refresh_plan()
+
+    def record_edit(self):
+        self.undo_stack.append((tuple(grid_dim), tuple(start), frozenset(dirty_cells)))
+        del self.undo_stack[:-MAX_UNDO]
+        self.redo_stack.clear()
+
+    def undo(self):
+        if not self.undo_stack: return
+        self.redo_stack.append((tuple(grid_dim), tuple(start), frozenset(dirty_cells)))
+        self.restore(*self.undo_stack.pop())
+
+    def redo(self):
+        if not self.redo_stack: return
+        self.undo_stack.append((tuple(grid_dim), tuple(start), frozenset(dirty_cells)))
+        self.restore(*self.redo_stack.pop())
+
+    def restore(self, dimension: tuple[int, int], start_pos: tuple[int, int], dirty: set[Position]):
+        """
+        Set the grid dimension, robot start and dirty cells, then redraw the grid.
+        A start outside of the grid is reset.
+        """
+        global dirty_cells
+        grid_dim[0], grid_dim[1] = dimension
+        start[0], start[1] = start_pos
+        dirty_cells = set(dirty)
+        if (start[1] > grid_dim[0]) or (start[0] > grid_dim[1]):
+            start[0], start[1] = 0, 0
+        refresh_plan()
+
+        setup_grid(self.canvas.axes, *grid_dim)
+        update_markersize(self.canvas)
+        self.dirty_layer = DirtyCellsLayer(self.canvas.axes, *grid_dim, dirty_cells)
+        self.blit.set_artists([self.dirty_layer.artist])
         self.canvas.draw()
 
 class Home(QtWidgets.QWidget):
@@ -390,9 +639,11 @@ class Home(QtWidgets.QWidget):
 
     def init_canvas(self):
         self.canvas = MplCanvas(width=5, height=4)
+        self.blit = BlitManager(self.canvas)
         self.cost_text = self.canvas.fig.text(.28, .93, '')
 
         plot_box = QtWidgets.QVBoxLayout()
+        plot_box.addWidget(NavigationToolbar2QT(self.canvas, self))
         plot_box.addWidget(self.canvas)
 
         placeholder_wid = QtWidgets.QWidget(parent=self)
@@ -402,20 +653,28 @@ class Home(QtWidgets.QWidget):
     
     def update_canvas(self):
         setup_grid(self.canvas.axes, *grid_dim)
-        self.dirty_cells, = self.canvas.axes.plot([pos.x for pos in dirty_cells], [pos.y for pos in dirty_cells],
-                                                  DIRTY_CELL_MARKER, color=DIRTY_CELL_COLOUR,
-                                                  markersize=DIRTY_CELL_MARKERSIZE)
+        self.dirty_layer = DirtyCellsLayer(self.canvas.axes, *grid_dim, dirty_cells)
         self.robot, = self.canvas.axes.plot([], [], ROBOT_MARKER, color=ROBOT_COLOUR,
                                             markersize=ROBOT_MARKERSIZE)
         self.path, = self.canvas.axes.plot([], [], PATH_MARKER, color=PATH_COLOUR)
+        # how often each cell was expanded during the running search
+        self.heat = np.zeros(grid_dim, dtype=np.float32)
+        self.heatmap = self.canvas.axes.imshow(self.heat, cmap=SEARCH_HEATMAP_CMAP,
+                                               alpha=SEARCH_HEATMAP_ALPHA, origin='lower',
+                                               interpolation='nearest', aspect='auto',
+                                               extent=(.5, grid_dim[1] + .5, .5, grid_dim[0] + .5),
+                                               visible=False)
+        self.best_state, = self.canvas.axes.plot([], [], ROBOT_MARKER, color=ROBOT_COLOUR,
+                                                 markersize=ROBOT_MARKERSIZE, fillstyle='none')
+        self.blit.set_artists([self.heatmap, self.dirty_layer.artist, self.robot,
+                               self.best_state, self.cost_text])
 
         if (start[0] != 0) and  (start[1] != 0):
             self.robot.set_xdata([start[0]])
             self.robot.set_ydata([start[1]])
 
         if path:
-            self.path.set_xdata([pos.x for pos in path])
-            self.path.set_ydata([pos.y for pos in path])
+            self.path.set_data(path[0], path[1])
         else:
             global total_cost
             total_cost = 0
@@ -429,24 +688,33 @@ class Home(QtWidgets.QWidget):
 
         self.run_button = QtWidgets.QPushButton('Run')
         self.place_button = QtWidgets.QPushButton('Place')
+        self.cancel_button = QtWidgets.QPushButton('Cancel')
 
         self.run_button.setFixedWidth(50)
         self.place_button.setFixedWidth(50)
+        self.cancel_button.setFixedWidth(50)
+        self.cancel_button.setDisabled(True)
 
         self.run_button.clicked.connect(self.run_algo)
         self.place_button.clicked.connect(self.set_pos)
+        self.cancel_button.clicked.connect(self.cancel_search)
+
+        self.status_text = QtWidgets.QLabel()
+        self.status_text.setAlignment(Qt.AlignmentFlag.AlignCenter)
 
         hbox = QtWidgets.QHBoxLayout()
         hbox.addWidget(self.place_button)
         hbox.addWidget(self.run_button)
+        hbox.addWidget(self.cancel_button)
 
         vbox = QtWidgets.QVBoxLayout()
         vbox.addWidget(self.input_box)
         vbox.addLayout(hbox)
+        vbox.addWidget(self.status_text)
 
         placeholder_wid = QtWidgets.QWidget()
         placeholder_wid.setLayout(vbox)
-        placeholder_wid.setFixedWidth(150)
+        placeholder_wid.setFixedWidth(400)
 
         self.vbox.addWidget(placeholder_wid, alignment=Qt.AlignmentFlag.AlignCenter)
 
@@ -458,50 +726,42 @@ class Home(QtWidgets.QWidget):
         
         self.run_button.setDisabled(True)
 
-        if not path:
-            path_exists = self.find_min_path()
-            if path_exists:
-                self.path.set_xdata([pos.x for pos in path])
-                self.path.set_ydata([pos.y for pos in path])
-            else:
-                InfoDialog("Could not find optimal path for current cofiguration :(").exec()
-                self.run_button.setDisabled(False)
-                return
-        
+        if not path: refresh_plan()
+        if not path: self.find_min_path()
+        else: self.animate_path()
 
-        clean_costs, cur_costs = [1], [0]
-        prev = None
-        for cell in path[1:]:
-            if prev == cell:
-                cur_costs.append(cur_costs[-1] + clean_costs[-1])
-                clean_costs.append(clean_costs[-1])
-            else:
-                clean_costs.append(clean_costs[-1] + 1)
-                cur_costs.append(cur_costs[-1] + 1)
-            prev = cell
+    def animate_path(self):
+        xs, ys, clean_costs, cur_costs = path
+        cleaning = np.zeros(len(xs), dtype=bool)
+        cleaning[1:] = (xs[1:] == xs[:-1]) & (ys[1:] == ys[:-1])
 
-        local_dirty = dirty_cells
-        prev = None
-        frame = 0
+        # draw once to cache the background with the path on it
+        self.canvas.draw()
+        next_frame = 0
+        # the first frame is shown after move_rate, as the timer's first tick
+        start_time = time.monotonic() + move_rate / 1000
         def animate(timer):
-            nonlocal frame, prev, local_dirty, clean_costs, cur_costs
+            nonlocal next_frame
 
-            if prev == path[frame]:
-                local_dirty = local_dirty - {path[frame]}
-                self.dirty_cells.set_data([cell.x for cell in local_dirty],
-                                          [cell.y for cell in local_dirty])
+            # frames are picked by elapsed time, so frames are skipped when drawing falls behind
+            frame = int((time.monotonic() - start_time) * 1000 / move_rate)
+            frame = min(max(frame, next_frame), len(xs) - 1)
+            if cleaning[next_frame:frame + 1].any():
+                cleaned = np.flatnonzero(cleaning[next_frame:frame + 1]) + next_frame
+                self.dirty_layer.remove([Position(int(xs[i]), int(ys[i])) for i in cleaned])
+            next_frame = frame + 1
 
-            prev = path[frame]
             self.cost_text.set_text(format_cost_text(clean_costs[frame], cur_costs[frame], total_cost))
-            self.robot.set_data([path[frame].x], [path[frame].y])
-            self.canvas.draw()
+            self.robot.set_data([xs[frame]], [ys[frame]])
+            self.blit.update()
 
-            if (frame := frame + 1) >= len(path):
+            if next_frame >= len(xs):
                 timer.stop()
                 self.update_canvas()
                 self.run_button.setDisabled(False)
 
-        timer = QTimer()
+        timer = QTimer(self)
+        timer.setTimerType(Qt.TimerType.PreciseTimer)
         timer.setInterval(move_rate)
         timer.timeout.connect(lambda: animate(timer))
         timer.start()
@@ -518,30 +778,84 @@ class Home(QtWidgets.QWidget):
                    x > grid_dim[1] or y > grid_dim[0]:
                     raise ValueError()
             else:
-                x, y = rand.choice([(i, j) for i in range(1, grid_dim[1] + 1)
-                                           for j in range(1, grid_dim[0] + 1)])
+                x, y = rand.randint(1, grid_dim[1]), rand.randint(1, grid_dim[0])
         except ValueError:
             ErrorDialog("Input grid coordinates as (x, y) to specify robot's position!\n"+\
                         "Note: x and y must be >= 1 and <= (grid dimension)").exec()
             return
         
         start[0], start[1] = x, y
-        self.robot.set_xdata([x])
-        self.robot.set_ydata([y])
-        self.canvas.draw()
+        refresh_plan()
+        self.update_canvas()
 
     def find_min_path(self):
+        self.place_button.setDisabled(True)
+        self.cancel_button.setDisabled(False)
+        self.status_text.setText("Searching...")
+
+        self.worker = PlannerWorker(set(dirty_cells), Position(*start), parent=self)
+        self.worker.progress.connect(self.show_progress)
+        self.worker.snapshot.connect(self.show_snapshot)
+        self.worker.solved.connect(self.on_solved)
+
+        self.heat = np.zeros(grid_dim, dtype=np.float32)
+        self.heatmap.set_data(self.heat)
+        self.heatmap.set_extent((.5, grid_dim[1] + .5, .5, grid_dim[0] + .5))
+        self.heatmap.set_visible(True)
+        self.worker.start()
+
+    def show_snapshot(self, snapshot: SearchSnapshot):
+        # snapshots of a superseded search may still be queued, and its grid may differ
+        if self.sender() is not self.worker: return
+        if snapshot.expanded:
+            xs, ys = np.array(snapshot.expanded).T
+            np.add.at(self.heat, (ys - 1, xs - 1), 1)
+            self.heatmap.set_data(self.heat)
+            self.heatmap.set_clim(0, self.heat.max())
+        self.best_state.set_data([snapshot.position.x], [snapshot.position.y])
+        self.blit.update()
+
+    def show_progress(self, expansions: int, frontier: int, best_f: float):
+        self.status_text.setText(f"Expansions: {expansions:<10}" +\
+                                 f"Frontier: {frontier:<10}" +\
+                                 f"Best f: {best_f:g}")
+
+    def cancel_search(self):
+        self.cancel_button.setDisabled(True)
+        self.worker.cancel()
+
+    def on_solved(self, goal):
         global path, total_cost
-        goal = astar_vacuum(dirty_cells, Position(*start),
-                            max_iter=MAX_ITER, do_traceback=True)
-        if not goal[0] is None:
+        self.place_button.setDisabled(False)
+        self.cancel_button.setDisabled(True)
+        self.status_text.clear()
+        self.heatmap.set_visible(False)
+        self.best_state.set_data([], [])
+        self.blit.update()
+
+        config_changed = (self.worker.dirty != dirty_cells) or\
+                         (self.worker.start_pos != Position(*start))
+        if not goal[0] is None and not config_changed:
             total_cost = goal[0].cost
-            path = []
-            for i, cell in enumerate(goal[1][:-1]):
-                path.extend(chebyshev_move(cell.position, goal[1][i + 1].position))
-            path.append(goal[0].position)
-        
-        return bool(path)
+            path = list(expand_path(goal[1]))
+            plan_cache.put(grid_dim, start, dirty_cells, total_cost,
+                           [cell.position for cell in goal[1][1:]])
+            self.path.set_data(path[0], path[1])
+            self.animate_path()
+            try: plan_cache.save()
+            except OSError as error:
+                InfoDialog("Plan not saved", f"Could not write the plan cache:\n{error.strerror}").exec()
+            return
+
+        if self.worker.cancelled:
+            InfoDialog("Search cancelled", "The search was cancelled.").exec()
+        elif config_changed:
+            InfoDialog("Search discarded", "The grid was changed during the search, please run again.").exec()
+        elif self.worker.timed_out:
+            InfoDialog("Time limit reached", f"Could not find optimal path within {TIME_LIMIT} seconds :(").exec()
+        else:
+            InfoDialog("No path found", "Could not find optimal path for current cofiguration :(").exec()
+        self.run_button.setDisabled(False)
 
 
 class MainWindow(QtWidgets.QMainWindow):
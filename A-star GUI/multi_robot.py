@@ -0,0 +1,157 @@
+from concurrent.futures import ProcessPoolExecutor
+from math import inf
+
+from algorithm import astar_vacuum
+from Cell import Position, metric_func, chebyshev_distance
+
+from typing import Iterable, Optional
+
+# a partition of one robot: (start, dirty cells assigned to the robot)
+partition = tuple[Position, frozenset[Position]]
+
+
+class MultiRobotPlan:
+    """
+    Result of planning for several robots.
+
+    # Attributes:
+    starts: the start position of each robot\
+
+    partitions: the dirty cells assigned to each robot\
+
+    costs: the minimum cost for each robot to clean its dirty cells.
+    This is infinity if no plan was found within the iteration limit.\
+
+    paths: for each robot, the start position followed by its dirty cells in cleaning order.
+    Use chebyshev_move (or DistanceTable.move) between consecutive positions to get the full path.
+    """
+    __slots__ = 'starts', 'partitions', 'costs', 'paths'
+    def __init__(self, starts: list[Position], partitions: list[frozenset[Position]],
+                 costs: list[float], paths: list[list[Position]]) -> None:
+        self.starts = starts
+        self.partitions = partitions
+        self.costs = costs
+        self.paths = paths
+
+    @property
+    def makespan(self) -> float:
+        """The largest cost among all robots"""
+        return max(self.costs, default=0)
+    @property
+    def total_cost(self) -> float:
+        """The sum of costs of all robots"""
+        return sum(self.costs)
+
+
+def _solve_partition(job: partition, max_iter: int,
+                     metric: Optional[metric_func]) -> tuple[float, list[Position]]:
+    start, dirty_cells = job
+    goal, traceback = astar_vacuum(dirty_cells, start, max_iter=max_iter,
+                                   metric=metric, do_traceback=True)
+    if goal is None: return inf, [start]
+    return goal.cost, [cell.position for cell in traceback]
+
+def partition_dirty_cells(dirty_cells: Iterable[Position], starts: list[Position], *,
+                          metric: Optional[metric_func] = None) -> list[set[Position]]:
+    """
+    Assign every dirty cell to the robot whose start is nearest to it. Ties are given to
+    the robot with fewer dirty cells so far.
+    """
+    if metric is None: metric = chebyshev_distance
+    partitions = [set() for _ in starts]
+    for cell in sorted(dirty_cells):
+        nearest = min(range(len(starts)),
+                      key=lambda i: (metric(starts[i], cell), len(partitions[i])))
+        partitions[nearest].add(cell)
+    return partitions
+
+def _boundary_moves(partitions: list[frozenset[Position]], starts: list[Position],
+                    robot: int, metric: metric_func,
+                    boundary_size: int) -> list[list[frozenset[Position]]]:
+    """
+    Candidate partitions that hand one of the robot's boundary cells to another robot,
+    or swap it with the closest boundary cell of that robot.
+    A boundary cell is one almost as close to another robot's start as to its own.
+    """
+    boundary = []
+    for cell in partitions[robot]:
+        own_dist = metric(starts[robot], cell)
+        for other in range(len(starts)):
+            if other != robot:
+                boundary.append((metric(starts[other], cell) - own_dist, cell, other))
+    boundary.sort()
+
+    candidates = []
+    for _, cell, other in boundary[:boundary_size]:
+        moved = list(partitions)
+        moved[robot] = partitions[robot] - {cell}
+        moved[other] = partitions[other] | {cell}
+        candidates.append(moved)
+
+        if partitions[other]:
+            swap_cell = min(partitions[other],
+                            key=lambda pos: (metric(starts[robot], pos) - metric(starts[other], pos), pos))
+            swapped = list(moved)
+            swapped[robot] = moved[robot] | {swap_cell}
+            swapped[other] = moved[other] - {swap_cell}
+            candidates.append(swapped)
+    return candidates
+
+def plan_multi_robot(dirty_cells: Iterable[Position], starts: Iterable[Position], *,
+                     max_iter: int = 100000,
+                     metric: Optional[metric_func] = None,
+                     rebalance_rounds: int = 10,
+                     boundary_size: int = 3,
+                     max_workers: Optional[int] = None) -> MultiRobotPlan:
+    """
+    Plan for several robots cleaning the same grid. Dirty cells are first assigned to the
+    nearest robot, then every partition is solved with astar_vacuum in its own process.
+    Afterwards, the partitions are rebalanced by moving or swapping boundary cells of the
+    robot with the largest cost, as long as this reduces the makespan (or the total cost
+    at equal makespan).
+
+    ## Parameters:
+    \tdirty_cells: positions of dirty cells\
+    \tstarts: the start position of each robot\
+    \tmax_iter: maximum iterations of astar_vacuum for each partition\
+    \tmetric: the travel distance between two positions, Chebyshev distance by default\
+    \trebalance_rounds: maximum number of rebalancing moves. Pass 0 to disable rebalancing.\
+    \tboundary_size: number of boundary cells tried in each rebalancing round\
+    \tmax_workers: number of processes used, by default the number of CPUs
+    ## Returns:
+    \tA MultiRobotPlan
+    """
+    starts = list(starts)
+    if not starts: raise ValueError("There must be at least one robot")
+    search_metric = metric if metric is not None else chebyshev_distance
+
+    solutions: dict[partition, tuple[float, list[Position]]] = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        def solve(candidates: list[list[frozenset[Position]]]) -> None:
+            jobs = {(starts[i], cells)
+                    for candidate in candidates for i, cells in enumerate(candidate)}
+            jobs = [job for job in jobs if not job in solutions]
+            results = executor.map(_solve_partition, jobs,
+                                   [max_iter] * len(jobs), [metric] * len(jobs))
+            solutions.update(zip(jobs, results))
+
+        def objective(candidate: list[frozenset[Position]]) -> tuple[float, float]:
+            costs = [solutions[(starts[i], cells)][0] for i, cells in enumerate(candidate)]
+            return max(costs), sum(costs)
+
+        partitions = [frozenset(cells) for cells in
+                      partition_dirty_cells(dirty_cells, starts, metric=search_metric)]
+        solve([partitions])
+        for _ in range(rebalance_rounds):
+            best = objective(partitions)
+            worst_robot = max(range(len(starts)),
+                              key=lambda i: solutions[(starts[i], partitions[i])][0])
+            candidates = _boundary_moves(partitions, starts, worst_robot,
+                                         search_metric, boundary_size)
+            solve(candidates)
+            improved = min(candidates, key=objective, default=None)
+            if improved is None or objective(improved) >= best: break
+            partitions = improved
+
+    costs, paths = zip(*(solutions[(starts[i], cells)] for i, cells in enumerate(partitions)))
+    return MultiRobotPlan(starts, partitions, list(costs), list(paths))
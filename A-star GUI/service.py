@@ -0,0 +1,244 @@
+"""
+Local JSON service for the vacuum planner and the Dijkstra router.
+
+Requests are solved by a pool of worker processes started with the service. Every worker
+keeps the graphs it has loaded in memory (see graph_vacuum._load_graph), so a graph file
+is only parsed again after it changes. Identical requests that arrive while one is being
+solved share its result instead of being solved again.
+
+Endpoints:
+
+    POST /vacuum  {"start": [x, y], "dirty": [[x, y], ...], "max_iter": 100000, "deadline": 10}
+    POST /route   {"graph": "graph.csv", "source": "0", "target": "3", "deadline": 10}
+    GET  /metrics latency histogram of each endpoint
+    GET  /health
+
+deadline is the number of seconds the client is willing to wait, DEFAULT_DEADLINE by
+default. A request that is not solved in time gets status 504.
+
+Usage: python service.py --port 8080 --workers 4 --graph graph.csv
+"""
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from multiprocessing import Pool, TimeoutError as PoolTimeout
+from multiprocessing.pool import AsyncResult
+from threading import Lock
+import argparse, bisect, json, os.path as osp, sys, time
+from math import inf
+
+sys.path.append(osp.join(osp.dirname(osp.abspath(__file__)), '..', 'Dijkstra'))
+from dijkstra import dijkstra
+
+from algorithm import astar_vacuum
+from Cell import Position
+from graph_vacuum import _load_graph
+
+from typing import Any, Callable, Optional
+
+
+# seconds a request may take when the client does not give a deadline
+DEFAULT_DEADLINE: float = 30
+# fields every request to an endpoint must have
+REQUIRED_FIELDS: dict[str, tuple[str, ...]] = {'/vacuum': ('start', 'dirty'),
+                                               '/route': ('graph', 'source', 'target')}
+# upper bounds of the latency histogram's buckets, in milliseconds
+LATENCY_BUCKETS: tuple[float, ...] = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+def _preload(filenames: list[str]) -> None:
+    for filename in filenames:
+        _load_graph(filename, osp.getmtime(filename))
+
+def solve_vacuum(start: list[int], dirty: list[list[int]], max_iter: int,
+                 deadline: float) -> dict[str, Any]:
+    """
+    Worker task for /vacuum. deadline is a time.time() timestamp, the search is cancelled
+    once it has passed.
+    """
+    def past_deadline(*_) -> bool: return time.time() > deadline
+    goal, traceback = astar_vacuum({Position(*pos) for pos in dirty}, Position(*start),
+                                   max_iter=max_iter, do_traceback=True,
+                                   progress=past_deadline, progress_interval=256)
+    if goal is None:
+        return {'status': 'timeout' if past_deadline() else 'unsolved'}
+    return {'status': 'solved', 'cost': goal.cost,
+            'path': [list(cell.position) for cell in traceback]}
+
+def solve_route(filename: str, source: str, target: str, deadline: float) -> dict[str, Any]:
+    """
+    Worker task for /route. deadline is a time.time() timestamp, the task gives up if it
+    has passed before the search, and the python backend cancels the search once it has.
+    """
+    def past_deadline(*_) -> bool: return time.time() > deadline
+    if past_deadline(): return {'status': 'timeout'}
+    nodes, adjacency_matrix = _load_graph(filename, osp.getmtime(filename))
+    if not source in nodes or not target in nodes:
+        raise ValueError(f"Node '{source if not source in nodes else target}' is not in the graph")
+    distance, path = dijkstra(nodes, adjacency_matrix, nodes[source][1], nodes[target][1],
+                              do_UCS=True, progress=past_deadline, progress_interval=256)
+    if past_deadline(): return {'status': 'timeout'}
+    if not path: return {'status': 'unreachable'}
+    return {'status': 'solved', 'distance': distance, 'path': [node.id for node in path]}
+
+
+class LatencyHistogram:
+    """
+    Thread-safe histogram of request latencies, one for every endpoint.
+    """
+    __slots__ = '_lock', '_counts', '_sums'
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._counts: dict[str, list[int]] = {}
+        self._sums: dict[str, float] = {}
+
+    def record(self, endpoint: str, seconds: float) -> None:
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, seconds * 1000)
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, [0] * (len(LATENCY_BUCKETS) + 1))
+            counts[bucket] += 1
+            self._sums[endpoint] = self._sums.get(endpoint, 0) + seconds
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            return {endpoint: {'buckets_ms': [*LATENCY_BUCKETS, 'inf'],
+                               'counts': list(counts),
+                               'count': sum(counts),
+                               'sum_seconds': self._sums[endpoint]}
+                    for endpoint, counts in self._counts.items()}
+
+
+class PlanningService:
+    """
+    Dispatch requests to a worker pool, sharing the result of identical requests in flight.
+
+    -----------
+    ## Methods:
+    submit: start solving a request, or join an identical one in flight.\n
+    handle: solve a request within its deadline and return (status code, response).\n
+    close: stop the worker pool.
+    """
+    __slots__ = 'pool', 'latency', '_in_flight', '_lock'
+    def __init__(self, workers: Optional[int] = None, graphs: tuple[str, ...] = ()) -> None:
+        """
+        Start the worker pool.
+
+        ## Parameters:
+        workers (int | None): number of worker processes, by default the number of CPUs\n
+        graphs (tuple[str, ...]): graph files every worker loads before taking requests
+        """
+        graphs = [osp.abspath(filename) for filename in graphs]
+        self.pool = Pool(workers, initializer=_preload, initargs=(graphs,))
+        self.latency = LatencyHistogram()
+        # key -> the result of the request in flight and the time its worker gives up
+        self._in_flight: dict[str, tuple[AsyncResult, float]] = {}
+        self._lock = Lock()
+
+    def submit(self, key: str, task: Callable, args: tuple, deadline: float = inf) -> AsyncResult:
+        """
+        Start task(*args) in the pool unless a request with the same key is in flight,
+        in which case its result is returned instead. deadline is the time.time() at which
+        the task gives up: a request in flight is only joined if it does not give up
+        earlier, otherwise its timeout would be returned before the new deadline.
+        """
+        with self._lock:
+            in_flight = self._in_flight.get(key)
+            if in_flight is not None and in_flight[1] >= deadline: return in_flight[0]
+
+            def done(_) -> None:
+                with self._lock:
+                    # a later request with the same key may have replaced this one
+                    if self._in_flight.get(key, (None,))[0] is result: del self._in_flight[key]
+            result = self.pool.apply_async(task, args, callback=done, error_callback=done)
+            self._in_flight[key] = (result, deadline)
+            return result
+
+    def handle(self, endpoint: str, request: dict[str, Any]) -> tuple[int, dict[str, Any]]:
+        begin = time.monotonic()
+        if not endpoint in REQUIRED_FIELDS: return 404, {'error': f"Unknown endpoint {endpoint}"}
+        missing = [field for field in REQUIRED_FIELDS[endpoint] if not field in request]
+        if missing:
+            self.latency.record(endpoint, time.monotonic() - begin)
+            return 400, {'error': f"Missing field '{missing[0]}'"}
+        try:
+            deadline = float(request.pop('deadline', DEFAULT_DEADLINE))
+            # identical requests only differ in their deadline
+            key = endpoint + json.dumps(request, sort_keys=True)
+            until = time.time() + deadline
+            if endpoint == '/vacuum':
+                args = (request['start'], request['dirty'], int(request.get('max_iter', 100000)), until)
+                result = self.submit(key, solve_vacuum, args, until)
+            else:
+                args = (osp.abspath(request['graph']), str(request['source']), str(request['target']),
+                        until)
+                result = self.submit(key, solve_route, args, until)
+
+            response = result.get(timeout=max(deadline - (time.monotonic() - begin), 0))
+            code = 504 if response['status'] == 'timeout' else 200
+        except PoolTimeout:
+            code, response = 504, {'status': 'timeout'}
+        except KeyError as error:
+            # the fields were checked above, so this comes from a worker looking up a node
+            code, response = 400, {'error': f"Unknown node {error}"}
+        except (TypeError, ValueError, OSError) as error:
+            code, response = 400, {'error': str(error)}
+        self.latency.record(endpoint, time.monotonic() - begin)
+        return code, response
+
+    def close(self) -> None:
+        self.pool.terminate()
+        self.pool.join()
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    # set by serve
+    service: PlanningService = None
+
+    def _reply(self, code: int, body: dict[str, Any]) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == '/metrics': self._reply(200, self.service.latency.to_dict())
+        elif self.path == '/health': self._reply(200, {'status': 'ok'})
+        else: self._reply(404, {'error': f"Unknown endpoint {self.path}"})
+
+    def do_POST(self) -> None:
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not isinstance(request, dict): raise ValueError("Request must be a JSON object")
+        except ValueError as error:
+            self._reply(400, {'error': str(error)})
+            return
+        self._reply(*self.service.handle(self.path, request))
+
+    def log_message(self, format: str, *args) -> None:
+        # latencies are in /metrics, do not print a line for every request
+        pass
+
+
+def serve(host: str = '127.0.0.1', port: int = 8080, *,
+          workers: Optional[int] = None, graphs: tuple[str, ...] = ()) -> None:
+    """
+    Run the service until interrupted.
+    """
+    service = PlanningService(workers, graphs)
+    RequestHandler.service = service
+    server = ThreadingHTTPServer((host, port), RequestHandler)
+    try: server.serve_forever()
+    except KeyboardInterrupt: pass
+    finally:
+        server.server_close()
+        service.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the vacuum planner and Dijkstra router over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1', help="address to listen on, localhost by default")
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, help="number of worker processes, by default the number of CPUs")
+    parser.add_argument('--graph', action='append', default=[], help="graph file to load on start, can be repeated")
+    args = parser.parse_args()
+    serve(args.host, args.port, workers=args.workers, graphs=tuple(args.graph))
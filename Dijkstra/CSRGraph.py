@@ -0,0 +1,264 @@
+from multiprocessing import shared_memory, resource_tracker
+from csv import reader
+import heapq as hq
+import numpy as np
+
+from typing import Optional
+
+
+class SharedGraphHandle:
+    """
+    Picklable description of a graph published to shared memory. Send this to worker
+    processes and attach to the graph with CSRGraph.attach.
+    """
+    __slots__ = 'name', 'node_no', 'edge_no', 'ids_size'
+    def __init__(self, name: str, node_no: int, edge_no: int, ids_size: int) -> None:
+        self.name = name
+        self.node_no = node_no
+        self.edge_no = edge_no
+        self.ids_size = ids_size
+
+    def __getstate__(self) -> tuple[str, int, int, int]:
+        return self.name, self.node_no, self.edge_no, self.ids_size
+
+    def __setstate__(self, state: tuple[str, int, int, int]) -> None:
+        self.name, self.node_no, self.edge_no, self.ids_size = state
+
+
+def _layout(handle: SharedGraphHandle) -> tuple[int, int, int, int]:
+    """Byte offsets of indptr, indices, weights and node ids in the shared segment"""
+    indices_start = (handle.node_no + 1) * 8
+    weights_start = indices_start + handle.edge_no * 8
+    ids_start = weights_start + handle.edge_no * 8
+    return 0, indices_start, weights_start, ids_start
+
+
+class CSRGraph:
+    """
+    A weighted graph stored as compressed sparse rows (CSR): the neighbours of node i are
+    indices[indptr[i]:indptr[i + 1]], with the weights of the edges at the same places in
+    weights. Unlike the nodes and adjacency matrix of from_csv, the whole graph is three
+    flat arrays, so it can be shared between processes without copying (see publish).
+
+    # Attributes:
+    indptr (np.ndarray): int64 array of length node_no + 1\
+
+    indices (np.ndarray): int64 array of neighbour indices\
+
+    weights (np.ndarray): float64 array of edge weights\
+
+    node_ids (list[str]): the id of each node, in index order
+
+    -----------
+    ## Methods:
+    from_csv: read a graph from a csv file of edges.\n
+    from_adjacency: convert the result of Node.from_csv.\n
+    index: the index of a node id.\n
+    publish: copy the graph into a shared memory segment.\n
+    attach: use a published graph without copying it.\n
+    close: release the shared memory of an attached or published graph.
+    """
+    __slots__ = 'indptr', 'indices', 'weights', 'node_ids', '_index', '_shm', '_handle', '_owner'
+    def __init__(self, indptr: np.ndarray, indices: np.ndarray, weights: np.ndarray,
+                 node_ids: list[str]) -> None:
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.node_ids = node_ids
+        self._index: Optional[dict[str, int]] = None
+        self._shm: Optional[shared_memory.SharedMemory] = None
+        self._handle: Optional[SharedGraphHandle] = None
+        self._owner = False
+
+    @classmethod
+    def from_edges(cls, edges: list[tuple[str, str, float]], *, directed: bool = False) -> 'CSRGraph':
+        """
+        Build a graph from (node_from, node_to, weight) edges. Nodes are indexed in the order
+        they first appear, like from_csv.
+        """
+        index: dict[str, int] = {}
+        for v_from, v_to, _ in edges:
+            index.setdefault(v_from, len(index))
+            index.setdefault(v_to, len(index))
+
+        sources = np.array([index[v_from] for v_from, _, _ in edges], dtype=np.int64)
+        targets = np.array([index[v_to] for _, v_to, _ in edges], dtype=np.int64)
+        weights = np.array([float(weight) for _, _, weight in edges], dtype=np.float64)
+        if not directed:
+            # every edge followed by its reverse, so that edges stay in file order
+            sources, targets = np.column_stack((sources, targets)).ravel(),\
+                               np.column_stack((targets, sources)).ravel()
+            weights = np.repeat(weights, 2)
+
+        # an edge given more than once keeps its last weight, like in from_csv
+        keys = (sources * len(index) + targets)[::-1]
+        _, last = np.unique(keys, return_index=True)
+        last = len(keys) - 1 - last
+        sources, targets, weights = sources[last], targets[last], weights[last]
+
+        indptr = np.zeros(len(index) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=len(index)), out=indptr[1:])
+        return cls(indptr, targets, weights, list(index))
+
+    @classmethod
+    def from_csv(cls, filename: str, *, directed: bool = False) -> 'CSRGraph':
+        """
+        Read a graph from a csv file where each line is node_from, node_to, weight.
+        The graph is undirected unless directed is True, like from_csv in Node.py.
+        """
+        with open(filename, newline='') as csvfile:
+            return cls.from_edges([tuple(line) for line in reader(csvfile, delimiter=',')],
+                                  directed=directed)
+
+    @classmethod
+    def from_adjacency(cls, nodes: dict, adjacency_matrix: list[list[float]]) -> 'CSRGraph':
+        """
+        Convert the nodes and adjacency matrix returned by from_csv. The edges are the
+        neighbours of each node, since a weight of 0 in the matrix may be an edge of weight 0.
+        """
+        node_list = [node for _, node in sorted(nodes.values(), key=lambda item: item[0])]
+        indptr, indices, weights = [0], [], []
+        for index, node in enumerate(node_list):
+            row = adjacency_matrix[index]
+            # a node is listed again for every duplicate edge, the matrix has the last weight
+            neighbours = dict.fromkeys(nodes[neighbour.id][0] for neighbour in node.neighbours)
+            indices.extend(neighbours)
+            weights.extend(float(row[neighbour]) for neighbour in neighbours)
+            indptr.append(len(indices))
+        return cls(np.array(indptr, dtype=np.int64), np.array(indices, dtype=np.int64),
+                   np.array(weights, dtype=np.float64), [node.id for node in node_list])
+
+    @property
+    def node_no(self) -> int: return len(self.indptr) - 1
+
+    def index(self, node_id: str) -> int:
+        """The index of a node id. Raises KeyError if there is no such node."""
+        if self._index is None:
+            self._index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        return self._index[node_id]
+
+    def publish(self) -> 'CSRGraph':
+        """
+        Copy the graph into a new shared memory segment and return the shared copy.
+        The shared copy owns the segment: use it as a context manager, or call close,
+        to remove the segment once every worker is done. Pass its `handle` to workers.
+        """
+        ids = '\0'.join(self.node_ids).encode()
+        handle = SharedGraphHandle('', self.node_no, len(self.indices), len(ids))
+        size = _layout(handle)[3] + len(ids)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        handle.name = shm.name
+
+        graph = CSRGraph._from_buffer(shm, handle)
+        graph.indptr[:] = self.indptr
+        graph.indices[:] = self.indices
+        graph.weights[:] = self.weights
+        shm.buf[_layout(handle)[3]:size] = ids
+        graph._owner = True
+        return graph
+
+    @classmethod
+    def attach(cls, handle: SharedGraphHandle) -> 'CSRGraph':
+        """
+        Use a graph published by another process. The arrays are views of the shared
+        segment, nothing is copied. Call close (or use a context manager) when done,
+        which does not remove the segment.
+        """
+        try: shm = shared_memory.SharedMemory(handle.name, track=False)
+        except TypeError:
+            # before Python 3.13, attaching registers the segment with the resource tracker.
+            # Child processes share the tracker of the publisher, which already knows the
+            # segment, but a process with its own tracker would remove the segment on exit.
+            shared_tracker = getattr(resource_tracker._resource_tracker, '_fd', None) is not None
+            shm = shared_memory.SharedMemory(handle.name)
+            if not shared_tracker: resource_tracker.unregister(shm._name, 'shared_memory')
+        return cls._from_buffer(shm, handle)
+
+    @classmethod
+    def _from_buffer(cls, shm: shared_memory.SharedMemory, handle: SharedGraphHandle) -> 'CSRGraph':
+        indptr_start, indices_start, weights_start, ids_start = _layout(handle)
+        indptr = np.ndarray(handle.node_no + 1, dtype=np.int64, buffer=shm.buf, offset=indptr_start)
+        indices = np.ndarray(handle.edge_no, dtype=np.int64, buffer=shm.buf, offset=indices_start)
+        weights = np.ndarray(handle.edge_no, dtype=np.float64, buffer=shm.buf, offset=weights_start)
+        ids = bytes(shm.buf[ids_start:ids_start + handle.ids_size]).decode()
+        graph = cls(indptr, indices, weights, ids.split('\0') if handle.node_no else [])
+        graph._shm = shm
+        graph._handle = handle
+        return graph
+
+    @property
+    def handle(self) -> SharedGraphHandle:
+        """The handle of a published or attached graph"""
+        if self._handle is None: raise ValueError("The graph is not in shared memory")
+        return self._handle
+
+    def close(self) -> None:
+        """
+        Release the shared memory of the graph. The segment is removed if this graph
+        published it. The arrays must not be used afterwards.
+        """
+        if self._shm is None: return
+        # the arrays hold references to the buffer, which must be gone before closing
+        self.indptr = self.indices = self.weights = None
+        self._shm.close()
+        if self._owner: self._shm.unlink()
+        self._shm = self._handle = None
+
+    def __enter__(self) -> 'CSRGraph': return self
+
+    def __exit__(self, *_) -> None: self.close()
+
+
+def dijkstra_csr(graph: CSRGraph, source: int,
+                 target: Optional[int] = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Dijkstra's algorithm over a CSRGraph, using node indices instead of Node objects.
+
+    ## Parameters:
+    \tgraph: the graph to search\
+    \tsource: index of the node to search from\
+    \ttarget: index of a node to stop at. By default, the whole graph is searched.
+    ## Returns:
+    \tA tuple of distances and previous indices, both arrays indexed by node. Unreached
+    nodes have distance infinity and the source and unreached nodes have previous -1.
+    Use `csr_path` to get the path to a node.
+    """
+    indptr, indices, weights = graph.indptr, graph.indices, graph.weights
+    distances = np.full(graph.node_no, np.inf)
+    previous = np.full(graph.node_no, -1, dtype=np.int64)
+    # python lists are much faster to index one item at a time than numpy arrays
+    dist = distances.tolist()
+    prev = previous.tolist()
+    done = [False] * graph.node_no
+
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        cur_dist, cur = hq.heappop(heap)
+        if done[cur]: continue
+        done[cur] = True
+        if cur == target: break
+
+        start, end = int(indptr[cur]), int(indptr[cur + 1])
+        for neighbour, weight in zip(indices[start:end].tolist(), weights[start:end].tolist()):
+            other_dist = cur_dist + weight
+            if other_dist < dist[neighbour]:
+                dist[neighbour] = other_dist
+                prev[neighbour] = cur
+                hq.heappush(heap, (other_dist, neighbour))
+
+    distances[:] = dist
+    previous[:] = prev
+    return distances, previous
+
+def csr_path(previous: np.ndarray, source: int, target: int) -> list[int]:
+    """
+    The node indices on the shortest path from source to target found by dijkstra_csr,
+    or an empty list if target was not reached.
+    """
+    if target != source and previous[target] < 0: return []
+    path = [target]
+    while target != source:
+        target = int(previous[target])
+        path.append(target)
+    return list(reversed(path))
@@ -0,0 +1,264 @@
+from Node import Node
+
+from csv import reader
+import heapq as hq
+from itertools import count
+from math import inf
+
+from typing import Callable, Iterable, Optional
+
+
+class ShortestPathTree:
+    """
+    Shortest paths from one source, kept up to date by DynamicGraph.
+
+    # Attributes:
+    source (str): the id of the source node\
+
+    distance (dict[str, float]): distance of every reached node from source\
+
+    parent (dict[str, str]): the previous node on the shortest path of every reached node
+    except source\
+
+    children (dict[str, set[str]]): the nodes whose parent is a node
+    """
+    __slots__ = 'source', 'distance', 'parent', 'children'
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.distance: dict[str, float] = {source: 0.0}
+        self.parent: dict[str, str] = {}
+        self.children: dict[str, set[str]] = {}
+
+    def _set_parent(self, node: str, parent: Optional[str]) -> None:
+        old = self.parent.get(node)
+        if old is not None: self.children[old].discard(node)
+        if parent is None: self.parent.pop(node, None)
+        else:
+            self.parent[node] = parent
+            self.children.setdefault(parent, set()).add(node)
+
+    def path(self, target: str) -> list[str]:
+        """The node ids on the shortest path from source to target, empty if unreachable."""
+        if not target in self.distance: return []
+        path = [target]
+        while target != self.source:
+            target = self.parent[target]
+            path.append(target)
+        return list(reversed(path))
+
+
+class DynamicGraph:
+    """
+    An undirected weighted graph whose edges can change. The shortest path trees of the
+    sources passed to `track` are repaired after every change instead of being searched
+    again, following Ramalingam and Reps: only the nodes whose distance changes are visited.
+
+    # Attributes:
+    adjacency (dict[str, dict[str, float]]): the weight of the edge between two node ids,
+    adjacency[u][v] == adjacency[v][u]\
+
+    version (int): incremented by every change of the graph\
+
+    trees (dict[str, ShortestPathTree]): the tracked tree of each source\
+
+    listeners (list[Callable[[str, str, float, float], None]]): called after every change
+    with the ends of the edge and its old and new weight, infinity if there is no edge
+
+    -----------
+    ## Methods:
+    from_csv: read a graph from a csv file of edges.\n
+    from_adjacency: convert the result of Node.from_csv.\n
+    set_weight, add_edge, remove_edge: change the graph and repair the tracked trees.\n
+    track, untrack: keep the shortest paths from a source up to date.\n
+    subscribe, unsubscribe: be told about every change.\n
+    dijkstra: the shortest path between two nodes.
+    """
+    __slots__ = 'adjacency', 'version', 'trees', 'listeners'
+    def __init__(self, edges: Iterable[tuple[str, str, float]] = ()) -> None:
+        self.adjacency: dict[str, dict[str, float]] = {}
+        self.version = 0
+        self.trees: dict[str, ShortestPathTree] = {}
+        self.listeners: list[Callable[[str, str, float, float], None]] = []
+        for v_from, v_to, weight in edges:
+            weight = self._check_weight(weight)
+            self.adjacency.setdefault(v_from, {})[v_to] = weight
+            self.adjacency.setdefault(v_to, {})[v_from] = weight
+
+    @classmethod
+    def from_csv(cls, filename: str) -> 'DynamicGraph':
+        """Read a graph from a csv file where each line is node_from, node_to, weight."""
+        with open(filename, newline='') as csvfile:
+            return cls(tuple(line) for line in reader(csvfile, delimiter=','))
+
+    @classmethod
+    def from_adjacency(cls, nodes: dict[str, tuple[int, Node]],
+                       adjacency_matrix: list[list[float]]) -> 'DynamicGraph':
+        """Convert the nodes and adjacency matrix returned by from_csv."""
+        return cls((node.id, neighbour.id, adjacency_matrix[index][nodes[neighbour.id][0]])
+                   for index, node in nodes.values() for neighbour in node.neighbours)
+
+    @staticmethod
+    def _check_weight(weight: float) -> float:
+        weight = float(weight)
+        if not weight >= 0: raise ValueError(f"Weights must not be negative, got {weight}")
+        return weight
+
+    def __contains__(self, node_id: str) -> bool: return node_id in self.adjacency
+
+    def weight(self, v_from: str, v_to: str) -> float:
+        """The weight of an edge, infinity if there is none."""
+        return self.adjacency.get(v_from, {}).get(v_to, inf)
+
+    def set_weight(self, v_from: str, v_to: str, weight: float) -> int:
+        """
+        Change the weight of an existing edge. Returns the number of nodes of the tracked
+        trees that were repaired. Raises KeyError if there is no such edge.
+        """
+        if not v_to in self.adjacency.get(v_from, {}):
+            raise KeyError(f"There is no edge between '{v_from}' and '{v_to}'")
+        return self._update(v_from, v_to, self._check_weight(weight))
+
+    def add_edge(self, v_from: str, v_to: str, weight: float) -> int:
+        """
+        Add an edge, and its nodes if they are new. Returns the number of nodes of the
+        tracked trees that were repaired. Raises ValueError if the edge exists.
+        """
+        if v_to in self.adjacency.get(v_from, {}):
+            raise ValueError(f"There already is an edge between '{v_from}' and '{v_to}'")
+        self.adjacency.setdefault(v_from, {})
+        self.adjacency.setdefault(v_to, {})
+        return self._update(v_from, v_to, self._check_weight(weight))
+
+    def remove_edge(self, v_from: str, v_to: str) -> int:
+        """
+        Remove an edge, its nodes stay in the graph. Returns the number of nodes of the
+        tracked trees that were repaired. Raises KeyError if there is no such edge.
+        """
+        if not v_to in self.adjacency.get(v_from, {}):
+            raise KeyError(f"There is no edge between '{v_from}' and '{v_to}'")
+        return self._update(v_from, v_to, None)
+
+    def _update(self, v_from: str, v_to: str, weight: Optional[float]) -> int:
+        old = self.weight(v_from, v_to)
+        if weight is None:
+            del self.adjacency[v_from][v_to], self.adjacency[v_to][v_from]
+            weight = inf
+        else: self.adjacency[v_from][v_to] = self.adjacency[v_to][v_from] = weight
+        self.version += 1
+
+        repaired = 0
+        for tree in self.trees.values():
+            if weight < old: repaired += self._decrease(tree, v_from, v_to, weight)
+            elif weight > old: repaired += self._increase(tree, v_from, v_to)
+        for listener in self.listeners: listener(v_from, v_to, old, weight)
+        return repaired
+
+    def _propagate(self, tree: ShortestPathTree, queue: list[tuple[float, int, str]],
+                   counter: count) -> int:
+        """Dijkstra from the queued nodes, visiting only nodes whose distance goes down."""
+        distance, settled = tree.distance, set()
+        while queue:
+            cur_dist, _, cur = hq.heappop(queue)
+            if cur in settled or cur_dist > distance.get(cur, inf): continue
+            settled.add(cur)
+            for neighbour, weight in self.adjacency[cur].items():
+                if cur_dist + weight < distance.get(neighbour, inf):
+                    distance[neighbour] = cur_dist + weight
+                    tree._set_parent(neighbour, cur)
+                    hq.heappush(queue, (cur_dist + weight, next(counter), neighbour))
+        return len(settled)
+
+    def _decrease(self, tree: ShortestPathTree, v_from: str, v_to: str, weight: float) -> int:
+        # a cheaper edge can only shorten paths through it, starting at one of its ends
+        queue, counter = [], count()
+        for a, b in ((v_from, v_to), (v_to, v_from)):
+            if tree.distance.get(a, inf) + weight < tree.distance.get(b, inf):
+                tree.distance[b] = tree.distance[a] + weight
+                tree._set_parent(b, a)
+                hq.heappush(queue, (tree.distance[b], next(counter), b))
+        return self._propagate(tree, queue, counter)
+
+    def _increase(self, tree: ShortestPathTree, v_from: str, v_to: str) -> int:
+        # a dearer edge only matters if it is in the tree, and then only for the subtree below it
+        if tree.parent.get(v_to) == v_from: root = v_to
+        elif tree.parent.get(v_from) == v_to: root = v_from
+        else: return 0
+
+        affected, stack = {root}, [root]
+        while stack:
+            for child in tree.children.get(stack.pop(), ()):
+                affected.add(child)
+                stack.append(child)
+        for node in affected:
+            del tree.distance[node]
+            tree._set_parent(node, None)
+
+        # the best way into every affected node from the rest of the tree, which is unchanged
+        queue, counter = [], count()
+        for node in affected:
+            best, best_parent = inf, None
+            for neighbour, weight in self.adjacency[node].items():
+                if not neighbour in affected and tree.distance.get(neighbour, inf) + weight < best:
+                    best, best_parent = tree.distance[neighbour] + weight, neighbour
+            if best_parent is not None:
+                tree.distance[node] = best
+                tree._set_parent(node, best_parent)
+                hq.heappush(queue, (best, next(counter), node))
+        self._propagate(tree, queue, counter)
+        return len(affected)
+
+    def track(self, source: str) -> ShortestPathTree:
+        """
+        Search the shortest paths from source once and keep them up to date from now on.
+        Raises KeyError if source is not in the graph.
+        """
+        if not source in self.adjacency: raise KeyError(f"Node '{source}' is not in the graph")
+        if not source in self.trees:
+            tree = ShortestPathTree(source)
+            self._propagate(tree, [(0.0, 0, source)], count(1))
+            self.trees[source] = tree
+        return self.trees[source]
+
+    def untrack(self, source: str) -> None:
+        """Stop repairing the tree of source."""
+        self.trees.pop(source, None)
+
+    def subscribe(self, listener: Callable[[str, str, float, float], None]) -> None:
+        """
+        Call listener after every change with v_from, v_to and the old and new weight of
+        the edge, infinity if the edge did not or no longer exists.
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[str, str, float, float], None]) -> None:
+        """Stop calling listener, if it was subscribed."""
+        if listener in self.listeners: self.listeners.remove(listener)
+
+    def dijkstra(self, source: str, target: str) -> tuple[float, list[str]]:
+        """
+        The distance and node ids of the shortest path from source to target, infinity and
+        an empty path if target is not reachable. Uses the tree of source if it is tracked.
+        """
+        for node_id in (source, target):
+            if not node_id in self.adjacency: raise KeyError(f"Node '{node_id}' is not in the graph")
+        if source in self.trees:
+            tree = self.trees[source]
+            return tree.distance.get(target, inf), tree.path(target)
+
+        distance, previous, settled = {source: 0.0}, {}, set()
+        queue, counter = [(0.0, 0, source)], count(1)
+        while queue:
+            cur_dist, _, cur = hq.heappop(queue)
+            if cur in settled: continue
+            settled.add(cur)
+            if cur == target: break
+            for neighbour, weight in self.adjacency[cur].items():
+                if cur_dist + weight < distance.get(neighbour, inf):
+                    distance[neighbour] = cur_dist + weight
+                    previous[neighbour] = cur
+                    hq.heappush(queue, (cur_dist + weight, next(counter), neighbour))
+
+        if not target in settled: return inf, []
+        path = [target]
+        while path[-1] != source: path.append(previous[path[-1]])
+        return distance[target], list(reversed(path))
@@ -0,0 +1,165 @@
+from DynamicGraph import DynamicGraph
+
+from array import array
+from collections import OrderedDict
+
+from typing import Any, Optional
+
+
+class _Entry:
+    """A cached shortest path, with the distance from its source to every node on it."""
+    __slots__ = 'path', 'prefix', 'distance'
+    def __init__(self, path: tuple[str, ...], prefix: array, distance: float) -> None:
+        self.path = path
+        self.prefix = prefix
+        self.distance = distance
+
+
+class QueryCache:
+    """
+    Bounded cache of shortest path queries on a DynamicGraph.
+
+    Every suffix of a shortest path is a shortest path itself, so a cached path from s to t
+    also answers the queries from any node on it to t. The cache subscribes to the graph:
+    when an edge gets dearer or is removed, only the paths through it are dropped, since
+    no other path got shorter. When an edge gets cheaper or is added, any path may have
+    a shortcut now and the whole cache is dropped. Call close once the cache is not used
+    anymore, so that the graph stops updating it.
+
+    # Attributes:
+    graph (DynamicGraph): the graph the queries are answered on\
+
+    max_nodes (int): the most path nodes kept in the cache, least recently used paths
+    are evicted first\
+
+    version (int): the version of the graph the cached paths belong to\
+
+    hits, suffix_hits, misses, evictions, invalidations (int): statistics, see stats.
+    invalidations counts the changes of the graph that dropped cached paths
+
+    -----------
+    ## Methods:
+    query: the distance and path from source to target, cached or searched.\n
+    get, put: look up or add a query.\n
+    invalidate: drop the cached paths through a node, or all of them.\n
+    close: stop following the changes of the graph.\n
+    stats: hit rates and counters.
+    """
+    __slots__ = 'graph', 'max_nodes', 'version', 'size', 'hits', 'suffix_hits', 'misses',\
+                'evictions', 'invalidations', '_entries', '_suffixes'
+    def __init__(self, graph: DynamicGraph, max_nodes: int = 100000) -> None:
+        self.graph = graph
+        self.max_nodes = max_nodes
+        self.version = graph.version
+        self.size = 0
+        self.hits = self.suffix_hits = self.misses = self.evictions = self.invalidations = 0
+        # (source, target) -> entry, least recently used first
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        # (node, target) -> the key of an entry whose path goes through node to target
+        self._suffixes: dict[tuple[str, str], tuple[str, str]] = {}
+        graph.subscribe(self._on_change)
+
+    def __len__(self) -> int: return len(self._entries)
+
+    def _clear(self) -> None:
+        if self._entries: self.invalidations += 1
+        self._entries.clear()
+        self._suffixes.clear()
+        self.size = 0
+
+    def _check_version(self) -> None:
+        # changes the cache was not told about, e.g. made before it subscribed again
+        if self.graph.version != self.version:
+            self._clear()
+            self.version = self.graph.version
+
+    def _on_change(self, v_from: str, v_to: str, old: float, new: float) -> None:
+        if new < old or self.version != self.graph.version - 1: self._clear()
+        else:
+            edge = {(v_from, v_to), (v_to, v_from)}
+            keys = [key for key, entry in self._entries.items()
+                    if any(pair in edge for pair in zip(entry.path, entry.path[1:]))]
+            if keys: self.invalidations += 1
+            for key in keys: self._remove(key)
+        self.version = self.graph.version
+
+    def get(self, source: str, target: str) -> Optional[tuple[float, list[str]]]:
+        """The cached distance and path from source to target, or None."""
+        self._check_version()
+        key = (source, target)
+        if (entry := self._entries.get(key)) is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.distance, list(entry.path)
+        if (longer := self._suffixes.get(key)) is not None:
+            entry = self._entries[longer]
+            self._entries.move_to_end(longer)
+            self.suffix_hits += 1
+            start = entry.path.index(source)
+            return entry.distance - entry.prefix[start], list(entry.path[start:])
+        self.misses += 1
+        return None
+
+    def put(self, source: str, target: str, distance: float, path: list[str]) -> None:
+        """
+        Cache the shortest path from source to target on the current version of the graph.
+        An empty path means target is not reachable.
+        """
+        self._check_version()
+        key = (source, target)
+        if key in self._entries: self._remove(key)
+
+        prefix = array('d', [0.0])
+        for v_from, v_to in zip(path, path[1:]):
+            prefix.append(prefix[-1] + self.graph.weight(v_from, v_to))
+        self._entries[key] = _Entry(tuple(path), prefix, distance)
+        self.size += max(len(path), 1)
+        # the target itself is answered by any query, only index the nodes before it
+        for node in path[1:-1]: self._suffixes[(node, target)] = key
+
+        while self.size > self.max_nodes and len(self._entries) > 1:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: tuple[str, str]) -> None:
+        entry = self._entries.pop(key)
+        self.size -= max(len(entry.path), 1)
+        for node in entry.path[1:-1]:
+            if self._suffixes.get((node, key[1])) == key: del self._suffixes[(node, key[1])]
+
+    def query(self, source: str, target: str) -> tuple[float, list[str]]:
+        """
+        The distance and node ids of the shortest path from source to target, like
+        DynamicGraph.dijkstra, searched only if the cache cannot answer it.
+        """
+        if (result := self.get(source, target)) is not None: return result
+        distance, path = self.graph.dijkstra(source, target)
+        self.put(source, target, distance, path)
+        return distance, path
+
+    def invalidate(self, node: Optional[str] = None) -> int:
+        """
+        Drop the cached paths that start at, end at or go through node, or every path if
+        node is None. Returns the number of paths dropped.
+        """
+        self._check_version()
+        keys = [key for key, entry in self._entries.items()
+                if node is None or node in key or node in entry.path]
+        for key in keys: self._remove(key)
+        return len(keys)
+
+    def close(self) -> None:
+        """Unsubscribe from the graph, the cache is dropped on the next change."""
+        self.graph.unsubscribe(self._on_change)
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of queries answered from the cache, by a whole or a suffix of a path"""
+        queries = self.hits + self.suffix_hits + self.misses
+        return (self.hits + self.suffix_hits) / queries if queries else 0.0
+
+    def stats(self) -> dict[str, Any]:
+        return {'entries': len(self._entries), 'nodes': self.size, 'version': self.version,
+                'hits': self.hits, 'suffix_hits': self.suffix_hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate, 'evictions': self.evictions,
+                'invalidations': self.invalidations}
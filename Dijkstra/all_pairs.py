@@ -0,0 +1,167 @@
+from CSRGraph import CSRGraph, SharedGraphHandle
+from delta_stepping import delta_stepping
+
+from multiprocessing import Pool
+import numpy as np
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+except ImportError:
+    csr_matrix = csgraph_dijkstra = None
+
+from typing import Iterable, Optional, Union
+
+# graphs with at most this many nodes and at least FLOYD_MIN_DENSITY of all possible edges
+# are solved with floyd_warshall by default, the others with one search per source. Without
+# scipy, the searches run in Python and floyd_warshall is faster on any graph of that size.
+FLOYD_MAX_NODES: int = 2000
+FLOYD_MIN_DENSITY: float = 0.3
+# side of the tiles of floyd_warshall, small enough for a tile product to stay in cache
+BLOCK_SIZE: int = 32
+# number of sources a worker searches from in one task
+CHUNK_SIZE: int = 64
+# a uint16 matrix stores unreachable pairs as this value, so distances must be smaller
+UINT16_UNREACHABLE: int = np.iinfo(np.uint16).max
+
+
+def floyd_warshall(distances: np.ndarray, *, block: int = BLOCK_SIZE) -> np.ndarray:
+    """
+    Blocked Floyd-Warshall on a dense float matrix, in place. distances[i, j] is the weight
+    of the edge from i to j, infinity if there is none, and 0 on the diagonal.
+
+    For every block of block intermediate nodes, the rows and columns of the block are
+    updated first, one node at a time, and then the rest of the matrix at once with the
+    min-plus product of the two panels, a strip of rows at a time.
+    """
+    node_no = len(distances)
+    for k_start in range(0, node_no, block):
+        k_end = min(k_start + block, node_no)
+        rows, columns = distances[k_start:k_end], distances[:, k_start:k_end]
+        for k in range(k_start, k_end):
+            np.minimum(rows, distances[k_start:k_end, k, None] + distances[None, k, :], out=rows)
+            np.minimum(columns, distances[:, k, None] + distances[None, k, k_start:k_end], out=columns)
+        for i in range(0, node_no, block):
+            strip = distances[i:i + block]
+            product = (columns[i:i + block, :, None] + rows[None, :, :]).min(axis=1)
+            np.minimum(strip, product, out=strip)
+    return distances
+
+def _dense(graph: CSRGraph) -> np.ndarray:
+    distances = np.full((graph.node_no, graph.node_no), np.inf)
+    rows = np.repeat(np.arange(graph.node_no), np.diff(graph.indptr))
+    # an edge given more than once keeps its smallest weight
+    np.minimum.at(distances, (rows, graph.indices), graph.weights)
+    np.fill_diagonal(distances, 0)
+    return distances
+
+def _convert(rows: np.ndarray, dtype: np.dtype) -> np.ndarray:
+    """Distances as float32, or uint16 with UINT16_UNREACHABLE for unreachable pairs."""
+    if dtype == np.float32: return rows.astype(np.float32)
+    reachable = np.isfinite(rows)
+    if np.any(rows[reachable] >= UINT16_UNREACHABLE - 0.5):
+        raise OverflowError(f"Distances of {UINT16_UNREACHABLE} or more do not fit in uint16, "
+                            f"use float32")
+    return np.where(reachable, np.rint(rows), UINT16_UNREACHABLE).astype(np.uint16)
+
+
+# the graph attached by each worker process, see _init_worker
+_worker_graph: Optional[CSRGraph] = None
+_worker_matrix: Optional['csr_matrix'] = None
+
+def _init_worker(handle: SharedGraphHandle) -> None:
+    global _worker_graph, _worker_matrix
+    _worker_graph = CSRGraph.attach(handle)
+    if csgraph_dijkstra is not None:
+        graph = _worker_graph
+        _worker_matrix = csr_matrix((graph.weights, graph.indices, graph.indptr),
+                                    shape=(graph.node_no, graph.node_no))
+
+def _search_rows(graph: CSRGraph, matrix: Optional['csr_matrix'], sources: np.ndarray,
+                 columns: Optional[np.ndarray]) -> np.ndarray:
+    """Distances from every source to every node, or to the nodes in columns."""
+    if matrix is not None:
+        # one call searches from all the sources in compiled code
+        rows = np.atleast_2d(csgraph_dijkstra(matrix, indices=sources))
+    else:
+        rows = np.array([delta_stepping(graph, source)[0] for source in sources.tolist()])
+    return rows if columns is None else rows[:, columns]
+
+def _worker_rows(task: tuple[int, np.ndarray, Optional[np.ndarray], np.dtype]) -> tuple[int, np.ndarray]:
+    start, sources, columns, dtype = task
+    return start, _convert(_search_rows(_worker_graph, _worker_matrix, sources, columns), dtype)
+
+
+def all_pairs(graph: CSRGraph, *,
+              subset: Optional[Iterable[str]] = None,
+              filename: Optional[str] = None,
+              dtype: Union[str, np.dtype] = 'float32',
+              method: str = 'auto',
+              workers: Optional[int] = None) -> np.ndarray:
+    """
+    Distances between every pair of nodes of a graph, or of a chosen set of nodes.
+    Read the graph from a csv file with CSRGraph.from_csv(filename), or convert the nodes
+    and adjacency matrix of from_csv with CSRGraph.from_adjacency(nodes, adjacency_matrix).
+
+    ## Parameters:
+    \tgraph: the graph\
+    \tsubset: ids of the nodes to compute the distances between. Row and column i of the
+    result belong to the i-th id. By default, all nodes in index order.\
+    \tfilename: if given, the result is a numpy memmap of this file, so that it does not
+    have to fit in memory. Open it again with np.memmap(filename, dtype, 'r', shape=(n, n)).\
+    \tdtype: 'float32', with infinity for unreachable pairs, or 'uint16', which rounds
+    distances to integers and stores unreachable pairs as UINT16_UNREACHABLE.\
+    \tmethod: 'floyd' for floyd_warshall on the dense matrix, 'dijkstra' for one search per
+    source of subset spread over a process pool, or 'auto' to choose by size and density
+    (see FLOYD_MAX_NODES). Each search uses scipy if it is installed and delta_stepping
+    otherwise.\
+    \tworkers: number of processes of the pool, by default the number of CPUs. With 1,
+    everything runs in this process.
+    ## Returns:
+    \tThe distance matrix.
+    ## Raises:
+    \tKeyError if a node of subset is not in the graph, OverflowError if a distance does not
+    fit in uint16
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.uint16):
+        raise ValueError(f"dtype must be float32 or uint16, got {dtype}")
+    node_no = graph.node_no
+    columns = None if subset is None else np.array([graph.index(node_id) for node_id in subset],
+                                                   dtype=np.int64)
+    sources = np.arange(node_no) if columns is None else columns
+    size = len(sources)
+
+    if method == 'auto':
+        density = len(graph.indices) / max(node_no * node_no, 1)
+        dense = density >= FLOYD_MIN_DENSITY or csgraph_dijkstra is None
+        method = 'floyd' if node_no <= FLOYD_MAX_NODES and dense else 'dijkstra'
+    if method not in ('floyd', 'dijkstra'):
+        raise ValueError(f"Unknown method '{method}', use 'floyd', 'dijkstra' or 'auto'")
+
+    if filename is None: result = np.empty((size, size), dtype=dtype)
+    else: result = np.memmap(filename, dtype=dtype, mode='w+', shape=(size, size))
+
+    if method == 'floyd':
+        distances = floyd_warshall(_dense(graph))
+        if columns is not None: distances = distances[np.ix_(columns, columns)]
+        result[:] = _convert(distances, dtype)
+    elif workers == 1 or size <= CHUNK_SIZE:
+        matrix = None
+        if csgraph_dijkstra is not None:
+            matrix = csr_matrix((graph.weights, graph.indices, graph.indptr), shape=(node_no, node_no))
+        for start in range(0, size, CHUNK_SIZE):
+            rows = _search_rows(graph, matrix, sources[start:start + CHUNK_SIZE], columns)
+            result[start:start + len(rows)] = _convert(rows, dtype)
+    else:
+        # workers attach to one shared copy of the graph and send back blocks of rows
+        with graph.publish() as shared, Pool(workers, initializer=_init_worker,
+                                             initargs=(shared.handle,)) as pool:
+            tasks = [(start, sources[start:start + CHUNK_SIZE], columns, dtype)
+                     for start in range(0, size, CHUNK_SIZE)]
+            # rows are written as they arrive, so only a few blocks are in memory at once
+            for start, rows in pool.imap_unordered(_worker_rows, tasks):
+                result[start:start + len(rows)] = rows
+
+    if filename is not None: result.flush()
+    return result
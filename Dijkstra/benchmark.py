@@ -0,0 +1,256 @@
+"""
+Benchmark from_csv and dijkstra on synthetic graphs.
+
+Graphs are generated with a fixed seed and written as csv files (node_from, node_to, weight),
+so that loading is timed the same way as for real data. Every (graph, size, engine) case
+runs in a fresh process so that its peak memory is measured on its own.
+
+Engines:
+    object  from_csv with dijkstra / dijkstra_multi_target (Node objects, dense matrix)
+    csr     CSRGraph.from_csv with dijkstra_csr
+    delta   CSRGraph.from_csv with delta_stepping (numpy bucket relaxation)
+
+The object engine stores an n x n adjacency matrix, so it is skipped for graphs with more
+than OBJECT_MAX_NODES nodes.
+
+Usage: python benchmark.py --sizes 1e3 1e4 1e5 -o results.json
+"""
+from concurrent.futures import ProcessPoolExecutor
+import argparse, json, math, os, os.path as osp, platform, random, resource, sys, tempfile, time
+import numpy as np
+
+from typing import Any, Callable, Optional
+
+# generated graphs are written as lists of (node_from, node_to, weight)
+edge_list = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# above this, the adjacency matrix of from_csv does not fit in memory
+OBJECT_MAX_NODES: int = 5000
+
+
+def grid_graph(edges: int, rng: np.random.Generator) -> edge_list:
+    """Square grid where every node is connected to its 4 neighbours, random weights 1 to 10."""
+    side = max(int(math.sqrt(edges / 2)), 2)
+    ids = np.arange(side * side).reshape(side, side)
+    sources = np.concatenate((ids[:, :-1].ravel(), ids[:-1, :].ravel()))
+    targets = np.concatenate((ids[:, 1:].ravel(), ids[1:, :].ravel()))
+    return sources, targets, rng.integers(1, 11, len(sources)).astype(float)
+
+def geometric_graph(edges: int, rng: np.random.Generator) -> edge_list:
+    """
+    Random geometric graph: points in the unit square, connected when closer than a radius
+    chosen for an average degree of 8. Weights are the distances.
+    """
+    node_no = max(edges // 4, 2)
+    radius = math.sqrt(8 / (math.pi * node_no))
+    points = rng.random((node_no, 2))
+    cells_per_side = max(int(1 / radius), 1)
+    cell_xy = np.minimum((points / radius).astype(np.int64), cells_per_side - 1)
+    cell = cell_xy[:, 0] * cells_per_side + cell_xy[:, 1]
+    order = np.argsort(cell, kind='stable')
+    sorted_cells = cell[order]
+    cell_start = np.searchsorted(sorted_cells, np.arange(cells_per_side ** 2))
+    cell_end = np.searchsorted(sorted_cells, np.arange(cells_per_side ** 2), side='right')
+    max_occupancy = int((cell_end - cell_start).max())
+
+    sources, targets = [], []
+    # each pair of neighbouring cells is only checked once
+    for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        other_x, other_y = cell_xy[:, 0] + dx, cell_xy[:, 1] + dy
+        valid = (other_x >= 0) & (other_x < cells_per_side) & (other_y >= 0) & (other_y < cells_per_side)
+        other_cell = np.where(valid, other_x * cells_per_side + other_y, 0)
+        for k in range(max_occupancy):
+            slot = cell_start[other_cell] + k
+            has_point = valid & (slot < cell_end[other_cell])
+            other = order[np.where(has_point, slot, 0)]
+            close = has_point & (np.hypot(*(points - points[other]).T) < radius)
+            if (dx, dy) == (0, 0): close &= np.arange(node_no) < other
+            sources.append(np.nonzero(close)[0])
+            targets.append(other[close])
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+    return sources, targets, np.hypot(*(points[sources] - points[targets]).T)
+
+def scale_free_graph(edges: int, rng: np.random.Generator) -> edge_list:
+    """
+    Barabasi-Albert graph: every new node connects to 4 existing nodes, chosen with
+    probability proportional to their degree. Random weights 1 to 10.
+    """
+    links = 4
+    node_no = max(edges // links, links + 1)
+    # every edge adds both ends here, so a uniform pick is a pick proportional to degree
+    endpoints = list(range(links))
+    sources, targets = [], []
+    picks = rng.random(node_no * links).tolist()
+    for node in range(links, node_no):
+        chosen = {endpoints[int(picks[node * links + k] * len(endpoints))] for k in range(links)}
+        for other in chosen:
+            sources.append(node)
+            targets.append(other)
+            endpoints.extend((node, other))
+    sources, targets = np.array(sources), np.array(targets)
+    return sources, targets, rng.integers(1, 11, len(sources)).astype(float)
+
+def road_graph(edges: int, rng: np.random.Generator) -> edge_list:
+    """
+    Road-like graph: a grid with jittered node positions and a quarter of the streets
+    removed, plus a sparse network of faster highways. Weights are travel times.
+    """
+    side = max(int(math.sqrt(edges / 1.5)), 2)
+    ids = np.arange(side * side).reshape(side, side)
+    points = np.stack(np.meshgrid(np.arange(side), np.arange(side), indexing='ij'), axis=-1)\
+               .reshape(-1, 2) + rng.uniform(-0.3, 0.3, (side * side, 2))
+    sources = np.concatenate((ids[:, :-1].ravel(), ids[:-1, :].ravel()))
+    targets = np.concatenate((ids[:, 1:].ravel(), ids[1:, :].ravel()))
+    kept = rng.random(len(sources)) >= 0.25
+    sources, targets = sources[kept], targets[kept]
+    speeds = np.ones(len(sources))
+
+    step = 10
+    highway_ids = ids[::step, ::step]
+    highway_sources = np.concatenate((highway_ids[:, :-1].ravel(), highway_ids[:-1, :].ravel()))
+    highway_targets = np.concatenate((highway_ids[:, 1:].ravel(), highway_ids[1:, :].ravel()))
+    sources = np.concatenate((sources, highway_sources))
+    targets = np.concatenate((targets, highway_targets))
+    speeds = np.concatenate((speeds, np.full(len(highway_sources), 3.0)))
+    return sources, targets, np.hypot(*(points[sources] - points[targets]).T) / speeds
+
+GENERATORS: dict[str, Callable[[int, np.random.Generator], edge_list]] = {
+    'grid': grid_graph, 'geometric': geometric_graph,
+    'scale_free': scale_free_graph, 'road': road_graph}
+
+
+def write_graph(generator: str, edges: int, seed: int, data_dir: str) -> str:
+    """
+    Generate a graph and write it as csv, unless it was already written with the same seed.
+    Returns the path of the csv file.
+    """
+    filename = osp.join(data_dir, f"{generator}_{edges}_{seed}.csv")
+    if osp.exists(filename): return filename
+    sources, targets, weights = GENERATORS[generator](edges, np.random.default_rng(seed))
+    temp_name = filename + '.tmp'
+    with open(temp_name, 'w') as csvfile:
+        for source, target, weight in zip(sources.tolist(), targets.tolist(), weights.tolist()):
+            csvfile.write(f"{source},{target},{weight:.6g}\n")
+    os.replace(temp_name, filename)
+    return filename
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def _timed(func: Callable, *args, **kwargs) -> tuple[Any, float]:
+    begin = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - begin
+
+def run_case(filename: str, engine: str, queries: int, seed: int) -> dict[str, Any]:
+    """
+    Time loading, a single query, one-to-all and a batch of queries with one engine.
+    Meant to run in its own process, see run_benchmark.
+    """
+    sys.path.insert(0, osp.dirname(osp.abspath(__file__)))
+    rng = random.Random(seed)
+    result: dict[str, Any] = {'engine': engine}
+
+    if engine == 'object':
+        from Node import from_csv
+        from dijkstra import dijkstra, dijkstra_multi_target
+        (nodes, adjacency_matrix), result['load_s'] = _timed(from_csv, filename)
+        node_list = [node for _, node in nodes.values()]
+        pairs = [tuple(rng.sample(node_list, 2)) for _ in range(queries + 1)]
+
+        _, result['single_query_s'] = _timed(dijkstra, nodes, adjacency_matrix, *pairs[0],
+                                             do_UCS=True, backend='python')
+        _, result['one_to_all_s'] = _timed(dijkstra_multi_target, nodes, adjacency_matrix,
+                                           pairs[0][0], node_list)
+        reached = [node for node in node_list if node.distance != math.inf]
+        result['relaxations'] = sum(len(node.neighbours) for node in reached)
+        begin = time.perf_counter()
+        for source, target in pairs[1:]:
+            dijkstra(nodes, adjacency_matrix, source, target, do_UCS=True, backend='python')
+        result['batch_s'] = time.perf_counter() - begin
+        result['nodes'] = len(nodes)
+        result['edges'] = sum(len(node.neighbours) for node in node_list) // 2
+    else:
+        from CSRGraph import CSRGraph, dijkstra_csr
+        from delta_stepping import delta_stepping
+        search = delta_stepping if engine == 'delta' else dijkstra_csr
+        graph, result['load_s'] = _timed(CSRGraph.from_csv, filename)
+        pairs = [tuple(rng.sample(range(graph.node_no), 2)) for _ in range(queries + 1)]
+
+        _, result['single_query_s'] = _timed(search, graph, *pairs[0])
+        (distances, _), result['one_to_all_s'] = _timed(search, graph, pairs[0][0])
+        degrees = np.diff(graph.indptr)
+        result['relaxations'] = int(degrees[np.isfinite(distances)].sum())
+        begin = time.perf_counter()
+        for source, target in pairs[1:]:
+            search(graph, source, target)
+        result['batch_s'] = time.perf_counter() - begin
+        result['nodes'] = graph.node_no
+        result['edges'] = len(graph.indices) // 2
+
+    result['relaxations_per_s'] = result['relaxations'] / max(result['one_to_all_s'], 1e-9)
+    result['batch_queries'] = queries
+    result['peak_rss_mb'] = _peak_rss_mb()
+    return result
+
+def run_benchmark(generators: list[str], sizes: list[int], engines: list[str], *,
+                  queries: int = 10, seed: int = 0,
+                  data_dir: Optional[str] = None) -> dict[str, Any]:
+    """
+    Run every (generator, size, engine) case and return the report. Generated graphs
+    are kept in data_dir, or in a temporary directory deleted afterwards.
+    """
+    if data_dir is None:
+        with tempfile.TemporaryDirectory(prefix='dijkstra_benchmark_') as temp_dir:
+            return run_benchmark(generators, sizes, engines, queries=queries, seed=seed,
+                                 data_dir=temp_dir)
+    os.makedirs(data_dir, exist_ok=True)
+    report = {'python': platform.python_version(), 'platform': platform.platform(),
+              'seed': seed, 'queries': queries, 'results': []}
+    for generator in generators:
+        for size in sizes:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                filename = executor.submit(write_graph, generator, size, seed, data_dir).result()
+            for engine in engines:
+                case = {'graph': generator, 'target_edges': size}
+                if engine == 'object':
+                    with open(filename) as csvfile:
+                        node_no = len({node for line in csvfile for node in line.split(',')[:2]})
+                    if node_no > OBJECT_MAX_NODES:
+                        report['results'].append({**case, 'engine': engine, 'nodes': node_no,
+                                                  'skipped': f"more than {OBJECT_MAX_NODES} nodes"})
+                        continue
+                # a new process for every case, so peak memory does not carry over
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    result = executor.submit(run_case, filename, engine, queries, seed).result()
+                report['results'].append({**case, **result})
+                print(f"{generator} {size} {engine}: load {result['load_s']:.3f}s, "
+                      f"one-to-all {result['one_to_all_s']:.3f}s, "
+                      f"{result['relaxations_per_s']:.3g} relaxations/s", file=sys.stderr)
+    return report
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Dijkstra's algorithm on synthetic graphs.")
+    parser.add_argument('--generators', nargs='+', choices=list(GENERATORS), default=list(GENERATORS))
+    parser.add_argument('--sizes', nargs='+', type=float, default=[1e3, 1e4, 1e5],
+                        help="approximate number of edges of each graph, up to 1e7")
+    parser.add_argument('--engines', nargs='+', choices=('object', 'csr', 'delta'),
+                        default=['object', 'csr', 'delta'])
+    parser.add_argument('--queries', type=int, default=10, help="number of queries in the batch")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-dir', help="where generated graphs are kept, by default a temporary directory deleted afterwards")
+    parser.add_argument('-o', '--output', default='-', help="JSON file for the report, stdout by default")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.generators, [int(size) for size in args.sizes], args.engines,
+                           queries=args.queries, seed=args.seed, data_dir=args.data_dir)
+    if args.output == '-': json.dump(report, sys.stdout, indent=2)
+    else:
+        with open(args.output, 'w') as output_file: json.dump(report, output_file, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+from CSRGraph import CSRGraph
+
+import numpy as np
+
+from typing import Optional
+
+def _split_edges(graph: CSRGraph, delta: float) -> tuple[tuple[np.ndarray, ...], tuple[np.ndarray, ...]]:
+    """The light (weight <= delta) and heavy edges of graph, each as (indptr, indices, weights)"""
+    rows = np.repeat(np.arange(graph.node_no), np.diff(graph.indptr))
+    split = []
+    for mask in (graph.weights <= delta, graph.weights > delta):
+        indptr = np.zeros(graph.node_no + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows[mask], minlength=graph.node_no), out=indptr[1:])
+        split.append((indptr, graph.indices[mask], graph.weights[mask]))
+    return split[0], split[1]
+
+def choose_delta(graph: CSRGraph) -> float:
+    """
+    Bucket width for delta_stepping. Following Meyer and Sanders, delta is about the largest
+    weight divided by the average degree, so that a node has O(1) light edges on average.
+    It is never less than the median weight, since every bucket costs a few numpy calls
+    however few nodes it holds. Without edges or positive weights, any delta will do.
+    """
+    if len(graph.weights) == 0: return 1.0
+    degree = len(graph.weights) / max(graph.node_no, 1)
+    delta = float(max(graph.weights.max() / degree, np.median(graph.weights)))
+    return delta if delta > 0 else 1.0
+
+def _relax(nodes: np.ndarray, edges: tuple[np.ndarray, ...], distances: np.ndarray,
+           previous: np.ndarray) -> np.ndarray:
+    """
+    Relax every edge out of nodes at once and return the nodes whose distance decreased.
+    """
+    indptr, indices, weights = edges
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    total = int(counts.sum())
+    if total == 0: return nodes[:0]
+
+    # gather the edge ids of every node: starts[k], starts[k] + 1, ..., for each node k
+    offsets = np.cumsum(counts) - counts
+    edge_ids = np.arange(total) - np.repeat(offsets, counts) + np.repeat(starts, counts)
+    sources = np.repeat(nodes, counts)
+    targets = indices[edge_ids]
+    candidates = distances[sources] + weights[edge_ids]
+
+    # scatter-min: the cheapest candidate of each target is first after sorting
+    order = np.lexsort((candidates, targets))
+    targets, candidates, sources = targets[order], candidates[order], sources[order]
+    first = np.ones(len(targets), dtype=bool)
+    first[1:] = targets[1:] != targets[:-1]
+    targets, candidates, sources = targets[first], candidates[first], sources[first]
+
+    improved = candidates < distances[targets]
+    targets = targets[improved]
+    distances[targets] = candidates[improved]
+    previous[targets] = sources[improved]
+    return targets
+
+def delta_stepping(graph: CSRGraph, source: int, target: Optional[int] = None, *,
+                   delta: Optional[float] = None) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Single-source shortest paths by delta-stepping (Meyer and Sanders). Nodes are kept in
+    buckets of width delta by distance. The nodes of the lowest bucket are relaxed together
+    with numpy, first over their light edges until the bucket stops changing and then
+    once over their heavy edges, instead of one edge at a time as in dijkstra_csr.
+    Weights must not be negative.
+
+    ## Parameters:
+    \tgraph: the graph to search\
+    \tsource: index of the node to search from\
+    \ttarget: index of a node to stop at. By default, the whole graph is searched.\
+    \tdelta: the bucket width, chosen with choose_delta by default
+    ## Returns:
+    \tA tuple of distances and previous indices like dijkstra_csr, use `csr_path` to get
+    the path to a node. With a target, only the distances of nodes closer than the target
+    are final.
+    """
+    if delta is None: delta = choose_delta(graph)
+    if not delta > 0: raise ValueError(f"delta must be positive, got {delta}")
+    light, heavy = _split_edges(graph, delta)
+
+    distances = np.full(graph.node_no, np.inf)
+    previous = np.full(graph.node_no, -1, dtype=np.int64)
+    settled = np.zeros(graph.node_no, dtype=bool)
+    distances[source] = 0.0
+    # nodes reached but not settled, the candidates for the next buckets
+    pending = np.array([source], dtype=np.int64)
+
+    while len(pending):
+        bucket = np.floor(distances[pending].min() / delta)
+        upper = (bucket + 1) * delta
+        in_bucket = distances[pending] < upper
+        frontier, pending = pending[in_bucket], pending[~in_bucket]
+
+        removed = [frontier]
+        while len(frontier):
+            settled[frontier] = True
+            improved = _relax(frontier, light, distances, previous)
+            # an improved node in this bucket is relaxed again, one in a later bucket waits
+            now_in_bucket = distances[improved] < upper
+            frontier = improved[now_in_bucket]
+            pending = np.concatenate((pending, improved[~now_in_bucket]))
+            removed.append(frontier)
+
+        # heavy edges always lead out of the bucket, so they are relaxed once at the end
+        removed = np.unique(np.concatenate(removed))
+        improved = _relax(removed, heavy, distances, previous)
+        pending = np.unique(np.concatenate((pending, improved)))
+        pending = pending[~settled[pending]]
+        if target is not None and settled[target]: break
+
+    return distances, previous
@@ -0,0 +1,224 @@
+from Node import Node
+from CSRGraph import CSRGraph, dijkstra_csr, csr_path
+
+import heapq as hq
+import numpy as np
+from itertools import count
+from math import inf
+
+try:
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra as csgraph_dijkstra
+except ImportError:
+    csr_matrix = csgraph_dijkstra = None
+
+from typing import Callable, Iterable, Optional
+
+# smallest graphs searched with scipy and, without scipy, with the array backend by default.
+# Converting a graph to arrays takes about as long as one pure Python search, and only
+# pays off when the graph is large enough or queried more than once.
+SCIPY_MIN_NODES: int = 256
+ARRAY_MIN_NODES: int = 2000
+# number of graphs whose array form is kept for the array and scipy backends
+BACKEND_CACHE_SIZE: int = 4
+
+def _construct_path(previous: dict[str, Node], source: Node, target: Node) -> list[Node]:
+    if target == source: return [source]
+    if not target.id in previous: return []
+
+    path = [target]
+    while target != source:
+        target = previous[target.id]
+        path.append(target)
+    return list(reversed(path))
+
+def _dijkstra_python(nodes: dict[str, tuple[int, Node]], adjacency_matrix: list[list[float]],
+                     source: Node, target: Node, *,
+                     do_UCS: bool = False,
+                     progress: Optional[Callable[[int], Optional[bool]]] = None,
+                     progress_interval: int = 1000) -> tuple[float, list[Node]]:
+    # the heap holds (distance, count, node) so that priorities do not change while queued,
+    # a node's old entries are skipped once it has been settled
+    my_queue: list[tuple[float, int, Node]] = []
+    previous: dict[str, Node] = {}
+    settled: set[str] = set()
+    counter = count()
+
+    for _, node in nodes.values(): node.distance = inf
+    source.distance = 0
+    if do_UCS: my_queue.append((0, next(counter), source))
+    else:
+        for _, node in nodes.values():
+            my_queue.append((node.distance, next(counter), node))
+        hq.heapify(my_queue)
+
+    while my_queue:
+        _, _, cur = hq.heappop(my_queue)
+        if cur.id in settled: continue
+        settled.add(cur.id)
+
+        if cur == target: break
+        if (progress is not None) and (len(settled) % progress_interval == 0) and\
+           progress(len(settled)):
+            return inf, []
+
+        for neighbour in cur.neighbours:
+            neighbour_index, cur_index = nodes[neighbour.id][0], nodes[cur.id][0]
+            other_dist = cur.distance + adjacency_matrix[cur_index][neighbour_index]
+            if other_dist < neighbour.distance:
+                neighbour.distance = other_dist
+                previous[neighbour.id] = cur
+                hq.heappush(my_queue, (other_dist, next(counter), neighbour))
+
+    if target.distance is inf:
+        path = []
+    else:
+        path = _construct_path(previous, source, target)
+    return target.distance, path
+
+class _ArrayGraph:
+    """The array form of a from_csv graph, made once and reused by the compiled backends."""
+    __slots__ = 'adjacency_matrix', 'node_list', 'graph', '_matrix'
+    def __init__(self, nodes: dict[str, tuple[int, Node]], adjacency_matrix: list[list[float]]) -> None:
+        # keeps the matrix alive, so that its id is not reused while it is cached
+        self.adjacency_matrix = adjacency_matrix
+        self.node_list = [node for _, node in sorted(nodes.values(), key=lambda item: item[0])]
+        self.graph = CSRGraph.from_adjacency(nodes, adjacency_matrix)
+        self._matrix = None
+
+    @property
+    def matrix(self) -> 'csr_matrix':
+        """The graph as a scipy sparse matrix, sharing the arrays of graph"""
+        if self._matrix is None:
+            self._matrix = csr_matrix((self.graph.weights, self.graph.indices, self.graph.indptr),
+                                      shape=(self.graph.node_no, self.graph.node_no))
+        return self._matrix
+
+_array_graphs: dict[int, _ArrayGraph] = {}
+
+def _array_graph(nodes: dict[str, tuple[int, Node]], adjacency_matrix: list[list[float]]) -> _ArrayGraph:
+    key = id(adjacency_matrix)
+    graph = _array_graphs.pop(key, None)
+    if graph is None:
+        graph = _ArrayGraph(nodes, adjacency_matrix)
+        if len(_array_graphs) >= BACKEND_CACHE_SIZE:
+            del _array_graphs[next(iter(_array_graphs))]
+    # most recently used last
+    _array_graphs[key] = graph
+    return graph
+
+def clear_backend_cache() -> None:
+    """
+    Forget the array form of every graph. Call this after changing an adjacency matrix
+    or the neighbours of its nodes in place, the array and scipy backends would use the
+    old graph otherwise.
+    """
+    _array_graphs.clear()
+
+def _search_array(graph: _ArrayGraph, source: int, target: int) -> tuple[np.ndarray, np.ndarray]:
+    return dijkstra_csr(graph.graph, source, target)
+
+def _search_scipy(graph: _ArrayGraph, source: int, target: int) -> tuple[np.ndarray, np.ndarray]:
+    # scipy cannot stop at the target, but searching the whole graph in C is still faster
+    return csgraph_dijkstra(graph.matrix, indices=source, return_predecessors=True)
+
+# a backend searches from a source index and returns the distances and predecessors of
+# every node, with a negative predecessor for the source and unreached nodes
+BACKENDS: dict[str, Callable[[_ArrayGraph, int, int], tuple[np.ndarray, np.ndarray]]] = {
+    'array': _search_array,     # dijkstra_csr, the heap search over flat arrays
+    'scipy': _search_scipy,     # scipy.sparse.csgraph.dijkstra, compiled
+}
+
+def available_backends() -> list[str]:
+    """Names of the backends dijkstra can use, 'python' included."""
+    return ['python', 'array'] + (['scipy'] if csgraph_dijkstra is not None else [])
+
+def choose_backend(node_no: int) -> str:
+    """
+    The backend dijkstra uses for a graph of node_no nodes when none is given: scipy for
+    large graphs if it is installed, the array backend for larger ones if it is not, and
+    pure Python otherwise.
+    """
+    if csgraph_dijkstra is not None: return 'scipy' if node_no >= SCIPY_MIN_NODES else 'python'
+    return 'array' if node_no >= ARRAY_MIN_NODES else 'python'
+
+def dijkstra(nodes: dict[str, tuple[int, Node]], adjacency_matrix: list[list[float]],
+             source: Node, target: Node, *,
+             do_UCS: bool = False, backend: Optional[str] = None,
+             progress: Optional[Callable[[int], Optional[bool]]] = None,
+             progress_interval: int = 1000) -> tuple[float, list[Node]]:
+    """
+    Find the shortest path from source to target.
+
+    ## Parameters:
+    \tnodes, adjacency_matrix: the graph as returned by from_csv\
+    \tsource: the node to search from\
+    \ttarget: the node to find the path to\
+    \tdo_UCS: only queue nodes once they are reached (uniform cost search), python backend only\
+    \tbackend: 'python', 'array' or 'scipy', see BACKENDS. By default one is chosen by the
+    size of the graph with choose_backend. The array and scipy backends convert the graph
+    once and keep it, see clear_backend_cache.\
+    \tprogress: called every `progress_interval` settled nodes with the number of settled
+    nodes. The search is cancelled if it returns True, and target is reported unreachable.
+    Python backend only.
+    ## Returns:
+    \tA tuple of the distance and the nodes on the path, an empty path if target is not
+    reachable. Like the python backend, the others set the distance of every node.
+    """
+    if backend is None: backend = choose_backend(len(nodes))
+    if backend == 'python':
+        return _dijkstra_python(nodes, adjacency_matrix, source, target, do_UCS=do_UCS,
+                                progress=progress, progress_interval=progress_interval)
+    if backend not in available_backends():
+        raise ValueError(f"Unknown or unavailable backend '{backend}', "
+                         f"use one of {available_backends()}")
+
+    graph = _array_graph(nodes, adjacency_matrix)
+    source_index, target_index = nodes[source.id][0], nodes[target.id][0]
+    distances, predecessors = BACKENDS[backend](graph, source_index, target_index)
+    for node, distance in zip(graph.node_list, distances.tolist()): node.distance = distance
+
+    path = csr_path(predecessors, source_index, target_index)
+    return target.distance, [graph.node_list[index] for index in path]
+
+def dijkstra_multi_target(nodes: dict[str, tuple[int, Node]], adjacency_matrix: list[list[float]],
+                          source: Node, targets: Iterable[Node]) -> tuple[dict[str, float], dict[str, Node]]:
+    """
+    Find the shortest distances from source to several targets with a single search.
+    The search stops as soon as every target has been reached.
+
+    ## Parameters:
+    \tnodes, adjacency_matrix: the graph as returned by from_csv\
+    \tsource: the node to search from\
+    \ttargets: the nodes to find the distances to
+    ## Returns:
+    \tA tuple of distances and previous nodes. Distances maps the id of each target to its
+    distance from source (infinity if unreachable). The previous nodes can be passed to
+    `_construct_path` to get the path from source to any of the targets.
+    """
+    my_queue: list[tuple[float, int, Node]] = [(0, 0, source)]
+    previous: dict[str, Node] = {}
+    settled: set[str] = set()
+    counter = count(1)
+
+    for _, node in nodes.values(): node.distance = inf
+    source.distance = 0
+
+    remaining = {target.id for target in targets}
+    target_ids = list(remaining)
+    while my_queue and remaining:
+        _, _, cur = hq.heappop(my_queue)
+        if cur.id in settled: continue
+        settled.add(cur.id)
+        remaining.discard(cur.id)
+
+        cur_index = nodes[cur.id][0]
+        for neighbour in cur.neighbours:
+            other_dist = cur.distance + adjacency_matrix[cur_index][nodes[neighbour.id][0]]
+            if other_dist < neighbour.distance:
+                neighbour.distance = other_dist
+                previous[neighbour.id] = cur
+                hq.heappush(my_queue, (other_dist, next(counter), neighbour))
+
+    distances = {target_id: nodes[target_id][1].distance for target_id in target_ids}
+    return distances, previous
@@ -0,0 +1,116 @@
+from DynamicGraph import DynamicGraph, ShortestPathTree
+
+import heapq as hq
+from itertools import count
+from math import inf
+
+from typing import Iterator, Optional
+
+def _tree_tail(tree: ShortestPathTree, node: str, blocked: set[str],
+               removed_edges: set[tuple[str, str]]) -> Optional[list[str]]:
+    """
+    The nodes after node on its tree path to the root, or None if the path goes through
+    a blocked node or a removed edge.
+    """
+    tail, cur = [], node
+    while cur != tree.source:
+        following = tree.parent[cur]
+        if following in blocked or (cur, following) in removed_edges: return None
+        tail.append(following)
+        cur = following
+    return tail
+
+def _spur_path(graph: DynamicGraph, tree: ShortestPathTree, spur: str, removed_nodes: set[str],
+               removed_edges: set[tuple[str, str]], limit: float) -> Optional[tuple[float, list[str]]]:
+    """
+    The shortest path from spur to the root of tree that avoids removed_nodes and
+    removed_edges, unless it is longer than limit. A* with the tree distances as heuristic:
+    they are exact in the whole graph, so they never overestimate in what is left of it.
+    As soon as the tree path of the expanded node is free, it is the rest of the answer.
+    """
+    distance = tree.distance
+    if not spur in distance: return None
+    cost, previous, closed = {spur: 0.0}, {}, set()
+    queue, counter = [(distance[spur], 0, spur)], count(1)
+    while queue:
+        f_value, _, cur = hq.heappop(queue)
+        if cur in closed: continue
+        if f_value > limit: return None
+        closed.add(cur)
+
+        prefix = [cur]
+        while prefix[-1] != spur: prefix.append(previous[prefix[-1]])
+        prefix.reverse()
+        # the tail must not go back through the prefix, or the path would have a loop
+        tail = _tree_tail(tree, cur, removed_nodes | set(prefix), removed_edges)
+        if tail is not None: return cost[cur] + distance[cur], prefix + tail
+
+        for neighbour, weight in graph.adjacency[cur].items():
+            if neighbour in closed or neighbour in removed_nodes or not neighbour in distance\
+               or (cur, neighbour) in removed_edges:
+                continue
+            if cost[cur] + weight < cost.get(neighbour, inf):
+                cost[neighbour] = cost[cur] + weight
+                previous[neighbour] = cur
+                hq.heappush(queue, (cost[neighbour] + distance[neighbour], next(counter), neighbour))
+    return None
+
+def k_shortest_paths(graph: DynamicGraph, source: str, target: str, k: Optional[int] = None, *,
+                     max_distance: float = inf) -> Iterator[tuple[float, list[str]]]:
+    """
+    The shortest loopless paths from source to target, shortest first (Yen's algorithm).
+    Paths are generated one at a time, so stop iterating once you have enough.
+
+    The spur searches are guided by one shortest path tree to target: the tracked tree
+    of target if there is one, otherwise one searched once here. A spur search usually
+    only expands a few nodes before it can follow the tree to target, so with a tracked
+    tree (see DynamicGraph.track) the first few paths take milliseconds on large graphs.
+
+    ## Parameters:
+    \tgraph: the graph, which must not change while iterating\
+    \tsource, target: the ids of the end nodes\
+    \tk: the most paths to generate, all of them by default\
+    \tmax_distance: stop before the first path longer than this
+    ## Yields:
+    \tTuples of the distance and the node ids of each path
+    ## Raises:
+    \tKeyError if source or target is not in the graph, RuntimeError if the graph changed
+    during iteration
+    """
+    for node_id in (source, target):
+        if not node_id in graph: raise KeyError(f"Node '{node_id}' is not in the graph")
+    version = graph.version
+    tree = graph.trees.get(target)
+    if tree is None:
+        tree = ShortestPathTree(target)
+        graph._propagate(tree, [(0.0, 0, target)], count(1))
+
+    found = _spur_path(graph, tree, source, set(), set(), max_distance)
+    if found is None or found[0] > max_distance: return
+    paths: list[list[str]] = []
+    candidates: list[tuple[float, int, list[str]]] = [(found[0], 0, found[1])]
+    seen = {tuple(found[1])}
+    counter = count(1)
+
+    while candidates:
+        distance, _, path = hq.heappop(candidates)
+        if distance > max_distance: return
+        paths.append(path)
+        yield distance, path
+        if k is not None and len(paths) >= k: return
+        if graph.version != version: raise RuntimeError("The graph changed during iteration")
+
+        root_cost = 0.0
+        for i, spur in enumerate(path[:-1]):
+            root = path[:i + 1]
+            # the next node of every path found so far that starts with the same root
+            removed_edges = {(spur, other[i + 1]) for other in paths
+                             if len(other) > i + 1 and other[:i + 1] == root}
+            spur_found = _spur_path(graph, tree, spur, set(root[:-1]), removed_edges,
+                                    max_distance - root_cost)
+            if spur_found is not None:
+                candidate = root[:-1] + spur_found[1]
+                if not tuple(candidate) in seen:
+                    seen.add(tuple(candidate))
+                    hq.heappush(candidates, (root_cost + spur_found[0], next(counter), candidate))
+            root_cost += graph.weight(spur, path[i + 1])